@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     # native authtoken support but need to enable the app
@@ -48,7 +49,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so it times the rest
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # serves the static files itself, so they skip everything below
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # before anything that reads or changes the response body
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,6 +98,56 @@ DATABASES = {
     }
 }
 
+# reuse connections from a pool in each worker process rather than
+#  connecting for every request (see core/db/pool.py)
+if os.getenv('DB_POOL_MAX_SIZE'):
+    DATABASES['default'].update({
+        'ENGINE': 'core.db.postgresql_pool',
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE')),
+            # seconds to wait for a free connection
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+            # ping connections that have been idle for this many seconds
+            'CHECK_AFTER': float(os.getenv('DB_POOL_CHECK_AFTER', 30)),
+            'MAX_LIFETIME': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+        },
+    })
+
+# behind a transaction-level pooler (e.g. pgbouncer with
+#  pool_mode=transaction) consecutive transactions can land on
+#  different server connections, so nothing may outlive a transaction.
+#  server-side cursors (used by .iterator()) do.
+if os.getenv('DB_TRANSACTION_POOLER', '').lower() in ('1', 'true'):
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2. they use the
+#  primary's credentials and, unless DB_REPLICA_NAME is set, its name.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'NAME': os.getenv('DB_REPLICA_NAME') or DATABASES['default']['NAME'],
+        # tests run against the primary only
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.replicas.PrimaryReplicaRouter']
+
+REPLICA_ROUTING = {
+    'REPLICAS': DATABASE_REPLICAS,
+    # seconds a user reads from the primary after writing. should
+    #  cover the replication lag.
+    'PIN_SECONDS': int(os.getenv('REPLICA_PIN_SECONDS', 10)),
+    # must be shared by all workers (e.g. memcached) for the pin to
+    #  follow the user from one worker to the next
+    'CACHE': 'default',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -130,6 +187,15 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# in development whitenoise serves the files straight from the apps
+if not DEBUG:
+    STATIC_ROOT = BASE_DIR / 'staticfiles'
+    # collectstatic writes content-hashed copies of the files (cached
+    #  for a year by whitenoise) along with .gz and .br versions
+    STATICFILES_STORAGE = (
+        'whitenoise.storage.CompressedManifestStaticFilesStorage'
+    )
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -141,4 +207,91 @@ AUTH_USER_MODEL = 'core.User'
 REST_FRAMEWORK = {
     # generate schema using openapi
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # orjson when it's installed, the stock json module otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# the default cache is per process. point CACHE_LOCATION at memcached
+#  when running several workers so they share the recipe data versions.
+if os.getenv('CACHE_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.getenv('CACHE_LOCATION'),
+        }
+    }
+
+# counts estimated from the query plan once they get big, rather than
+#  counted (see core.counting)
+COUNT_ESTIMATE = {
+    # rows. fewer than this are counted exactly.
+    'EXACT_BELOW': int(os.getenv('COUNT_EXACT_BELOW', 10000)),
+}
+
+# responses compressed by core.middleware.CompressionMiddleware
+COMPRESSION = {
+    # bytes. smaller responses are sent as they are.
+    'MIN_LENGTH': int(os.getenv('COMPRESSION_MIN_LENGTH', 500)),
+    'GZIP_LEVEL': 6,
+    # 0-11. higher levels cost too much CPU to do per response.
+    'BROTLI_QUALITY': 4,
+}
+
+SPECTACULAR_SETTINGS = {
+    # the swagger UI is loaded from a CDN by default. point this at a
+    #  copy under STATIC_URL to serve it through whitenoise instead.
+    'SWAGGER_UI_DIST': os.getenv(
+        'SWAGGER_UI_DIST',
+        '//unpkg.com/swagger-ui-dist@3.44.0',
+    ),
+}
+
+# the schema served at /api/schema, see core.schema
+SCHEMA_CACHE = {
+    # where generate_schema writes it, one file per version of the code
+    'DIR': os.getenv('SCHEMA_CACHE_DIR', BASE_DIR / 'schema'),
+    # generate it in the web process when there's no file for the
+    #  current code. turn off in production, so no request can cost a
+    #  generation (the schema is a 503 until generate_schema is run).
+    'LIVE': os.getenv('SCHEMA_LIVE_GENERATION', 'true').lower() in (
+        '1', 'true',
+    ),
+    # seconds clients and proxies may keep it. they revalidate with
+    #  the ETag after that.
+    'MAX_AGE': int(os.getenv('SCHEMA_MAX_AGE', 86400)),
+}
+
+# /metrics, see core.metrics
+METRICS = {
+    # when set, scrapes must send "Authorization: Bearer <token>". without
+    #  it anyone who can reach /metrics can read it, so it must only be
+    #  reachable from inside the network.
+    'TOKEN': os.getenv('METRICS_TOKEN') or None,
+}
+
+# per-user recipe/tag responses cached by recipe.caching
+RESPONSE_CACHE = {
+    'CACHE': 'default',
+    # seconds. a write invalidates sooner by bumping the user's version.
+    'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300)),
+}
+
+# token -> user lookups cached by core.authentication
+TOKEN_AUTH_CACHE = {
+    # entries kept in each worker's in-process LRU
+    'MAX_SIZE': int(os.getenv('TOKEN_AUTH_CACHE_MAX_SIZE', 10000)),
+    # seconds a worker trusts its own copy. other workers only see
+    #  a deleted token or deactivated user once this runs out.
+    'TTL': int(os.getenv('TOKEN_AUTH_CACHE_TTL', 30)),
+    # optional alias from CACHES shared by all workers (e.g. memcached)
+    'SHARED_CACHE': os.getenv('TOKEN_AUTH_SHARED_CACHE') or None,
+    'SHARED_TTL': int(os.getenv('TOKEN_AUTH_SHARED_CACHE_TTL', 300)),
 }
@@ -0,0 +1,62 @@
+"""
+Django settings for API-only nodes.
+
+Use with DJANGO_SETTINGS_MODULE=app.settings_api. Everything from
+app.settings, less what only browsers use: the admin, the schema and
+docs views, sessions, messages, static files and the browsable API.
+Workers import and set up less, so they start faster (compare the two
+with the profile_startup command).
+"""
+from app.settings import *  # noqa: F401,F403
+from app.settings import (
+    INSTALLED_APPS,
+    MIDDLEWARE,
+    REST_FRAMEWORK,
+    TEMPLATES,
+)
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS if app not in [
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+        'drf_spectacular',
+    ]
+]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE if middleware not in [
+        'whitenoise.middleware.WhiteNoiseMiddleware',
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        # sets request.user from the session. DRF authenticates the
+        #  API requests itself.
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+    ]
+]
+
+ROOT_URLCONF = 'app.urls_api'
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {
+        'context_processors': [
+            processor
+            for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+            if not processor.startswith('django.contrib.messages.')
+        ],
+    },
+}]
+
+REST_FRAMEWORK = {
+    **{
+        key: value for key, value in REST_FRAMEWORK.items()
+        if key != 'DEFAULT_SCHEMA_CLASS'
+    },
+    'DEFAULT_RENDERER_CLASSES': ['core.renderers.FastJSONRenderer'],
+    # no sessions to authenticate with
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.authentication.CachedTokenAuthentication',
+    ],
+}
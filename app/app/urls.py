@@ -13,17 +13,17 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
+from drf_spectacular.views import SpectacularSwaggerView
 from django.contrib import admin
 # include allows us to use urls from a differnt app
 from django.urls import path, include
 
+from core.schema import SchemaView
+from core.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema', SpectacularAPIView.as_view(), name='api-schema'),
+    path('api/schema', SchemaView.as_view(), name='api-schema'),
     path(
         'api/docs',
         SpectacularSwaggerView.as_view(url_name='api-schema'),
@@ -31,4 +31,7 @@ urlpatterns = [
     ),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    # scraped by prometheus. keep it off the public internet, or set
+    #  METRICS_TOKEN (see settings.METRICS).
+    path('metrics', metrics, name='metrics'),
 ]
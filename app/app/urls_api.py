@@ -0,0 +1,16 @@
+"""
+URL configuration for API-only nodes (see app.settings_api).
+
+The API of app.urls, without the admin and the schema and docs views.
+"""
+from django.urls import path, include
+
+from core.views import metrics
+
+urlpatterns = [
+    path('api/user/', include('user.urls')),
+    path('api/recipe/', include('recipe.urls')),
+    # scraped by prometheus. keep it off the public internet, or set
+    #  METRICS_TOKEN (see settings.METRICS).
+    path('metrics', metrics, name='metrics'),
+]
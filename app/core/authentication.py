@@ -0,0 +1,161 @@
+"""
+Authentication for the APIs.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """LRU cache of token key -> token (with its user), with a TTL."""
+
+    key_prefix = 'auth-token:'
+
+    def __init__(self, max_size, ttl, shared_cache=None, shared_ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # alias from settings.CACHES, shared between worker processes
+        self.shared_cache = shared_cache
+        self.shared_ttl = shared_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _shared(self):
+        if self.shared_cache is None:
+            return None
+        return caches[self.shared_cache]
+
+    def get(self, key):
+        """Return the cached token for key, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, token = entry
+                if expires > now:
+                    # most recently used goes to the end
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return token
+                del self._entries[key]
+
+        shared = self._shared()
+        token = shared.get(self.key_prefix + key) if shared else None
+        with self._lock:
+            if token is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._set_local(key, token)
+        return token
+
+    def set(self, key, token):
+        """Cache token under key."""
+        self._set_local(key, token)
+        shared = self._shared()
+        if shared:
+            shared.set(self.key_prefix + key, token, self.shared_ttl)
+
+    def _set_local(self, key, token):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, token)
+            self._entries.move_to_end(key)
+            # evict the least recently used
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Forget the token for key."""
+        with self._lock:
+            self._entries.pop(key, None)
+        shared = self._shared()
+        if shared:
+            shared.delete(self.key_prefix + key)
+
+    def clear(self):
+        """Forget every token held by this worker and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+
+def _build_token_cache():
+    config = settings.TOKEN_AUTH_CACHE
+    return TokenCache(
+        max_size=config['MAX_SIZE'],
+        ttl=config['TTL'],
+        shared_cache=config.get('SHARED_CACHE'),
+        shared_ttl=config.get('SHARED_TTL'),
+    )
+
+
+# one per worker process
+token_cache = _build_token_cache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token -> user lookup.
+
+    Drop-in replacement for DRF's TokenAuthentication, which queries
+    the database on every request.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            # raises AuthenticationFailed for unknown keys and
+            #  inactive users, so only good tokens are cached
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+            return (user, token)
+
+        # hand out copies so that a view changing request.user can't
+        #  leak into later requests
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return (token.user, token)
+
+
+# invalidation. signals catch writes from the API (e.g.
+#  UserSerializer.update), the admin and the shell alike.
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Drop a deleted token from the cache."""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Drop a modified (e.g. deactivated) user's token from the cache."""
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key',
+        flat=True,
+    ):
+        token_cache.delete(key)
@@ -0,0 +1,243 @@
+"""
+Per-process pool of database connections.
+
+Django opens a connection per request (CONN_MAX_AGE=0) or keeps one per
+thread (CONN_MAX_AGE>0). The pool sits in between: when Django closes a
+connection it goes back to the pool, and the next connection Django
+opens, on any thread, is taken from it. So the connect (TLS and auth)
+handshake only happens when the pool grows, and the number of
+connections a worker holds is capped.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of raw DB-API connections."""
+
+    def __init__(
+        self,
+        connect,
+        max_size=10,
+        timeout=5,
+        check_after=30,
+        max_lifetime=3600,
+    ):
+        # called to open a new raw connection
+        self._connect = connect
+        self.max_size = max_size
+        # seconds to wait for a free connection before giving up
+        self.timeout = timeout
+        # seconds a connection may sit idle before it is pinged on its
+        #  way out of the pool. 0 pings every time.
+        self.check_after = check_after
+        # seconds after which a connection is closed instead of reused
+        self.max_lifetime = max_lifetime
+        self.pid = os.getpid()
+
+        # (connection, returned at) pairs, most recently used last
+        self._idle = deque()
+        self._opened_at = {}
+        self._size = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        self.acquired = 0
+        self.opened = 0
+        self.discarded = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def acquire(self):
+        """Return a healthy connection, waiting for one if the pool is full."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    # the most recently used, so that surplus connections
+                    #  sit idle and can age out
+                    connection, idle_since = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # reserve a slot, the connect happens outside the lock
+                    connection = idle_since = None
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No database connection free after {self.timeout}s '
+                        f'({self.max_size} in use).'
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            self.acquired += 1
+            if waited:
+                wait = time.monotonic() - started
+                self.waits += 1
+                self.wait_seconds_total += wait
+                self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+        if connection is not None and not self._is_healthy(
+            connection, idle_since,
+        ):
+            # its slot is kept for the replacement
+            self._close(connection)
+            with self._cond:
+                self.discarded += 1
+                self._opened_at.pop(connection, None)
+            connection = None
+        if connection is None:
+            try:
+                connection = self._connect()
+            except Exception:
+                # give the slot back
+                with self._cond:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.opened += 1
+                self._opened_at[connection] = time.monotonic()
+        return connection
+
+    def release(self, connection):
+        """Return a connection to the pool (or close it if unusable)."""
+        reusable = self._reset(connection) and (
+            time.monotonic() - self._opened_at.get(connection, 0)
+            < self.max_lifetime
+        )
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(connection)
+
+    def discard(self, connection):
+        """Close a checked out connection rather than returning it."""
+        with self._cond:
+            self._in_use -= 1
+        self._discard(connection)
+
+    def close(self):
+        """Close all of the idle connections."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        """Return the pool's occupancy and acquire wait counters."""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'acquired': self.acquired,
+                'opened': self.opened,
+                'discarded': self.discarded,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': self.wait_seconds_total,
+                'wait_seconds_max': self.wait_seconds_max,
+            }
+
+    def _is_healthy(self, connection, idle_since):
+        # free checks first, a round trip only for connections that
+        #  have been idle long enough for the server (or a firewall)
+        #  to have dropped them
+        if connection.closed:
+            return False
+        if time.monotonic() - idle_since < self.check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def _reset(self, connection):
+        # a connection only goes back to the pool outside of a
+        #  transaction, so that the next user starts clean
+        if connection.closed:
+            return False
+        try:
+            status = connection.info.transaction_status
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+                status = connection.info.transaction_status
+        except Exception:
+            return False
+        return status == extensions.TRANSACTION_STATUS_IDLE
+
+    def _discard(self, connection):
+        self._close(connection)
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._opened_at.pop(connection, None)
+            self._cond.notify()
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, **options):
+    """Return the pool for key, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        # a pool inherited from the parent of a forked worker shares its
+        #  sockets, so leave it alone and start a new one
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(connect, **options)
+        return pool
+
+
+def close_pools(alias=None):
+    """Close the idle connections of every pool (or those for alias)."""
+    with _pools_lock:
+        pools = [
+            pool for key, pool in _pools.items()
+            if alias is None or key[0] == alias
+        ]
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """Return the stats of every pool in this process, by alias."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        alias: pool.stats()
+        for (alias, _), pool in pools
+        if pool.pid == os.getpid()
+    }
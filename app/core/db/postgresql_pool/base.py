@@ -0,0 +1,82 @@
+"""
+PostgreSQL backend that takes its connections from a ConnectionPool.
+
+Configured with a POOL dict next to the usual database settings:
+
+    'ENGINE': 'core.db.postgresql_pool',
+    'POOL': {'MAX_SIZE': 10, 'TIMEOUT': 5, ...},
+"""
+import psycopg2.extras
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import (
+    base,
+    creation,
+)
+
+from core.db.pool import (
+    close_pools,
+    get_pool,
+)
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Test database creation that lets go of pooled connections."""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # postgres won't drop a database with open connections
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL database wrapper backed by a connection pool."""
+    creation_class = DatabaseCreation
+
+    def _get_pool(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+        return get_pool(
+            # the test runner renames the database
+            (self.alias, self.settings_dict['NAME']),
+            lambda: base.Database.connect(**conn_params),
+            max_size=options.get('MAX_SIZE', 10),
+            timeout=options.get('TIMEOUT', 5),
+            check_after=options.get('CHECK_AFTER', 30),
+            max_lifetime=options.get('MAX_LIFETIME', 3600),
+        )
+
+    def get_new_connection(self, conn_params):
+        # connections used to create and drop databases aren't pooled
+        if self.alias == NO_DB_ALIAS:
+            return super().get_new_connection(conn_params)
+
+        # remembered so the connection goes back where it came from
+        self.pool = self._get_pool(conn_params)
+        connection = self.pool.acquire()
+        # the same as the stock backend does for a new connection
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection,
+            loads=lambda x: x,
+        )
+        return connection
+
+    def _close(self):
+        if self.alias == NO_DB_ALIAS:
+            return super()._close()
+        if self.in_atomic_block:
+            # django keeps hold of a connection closed inside atomic()
+            #  so that using it fails. it mustn't be handed to anyone
+            #  else meanwhile.
+            self.pool.discard(self.connection)
+        else:
+            # a broken connection or one left in a transaction is
+            #  closed rather than pooled
+            self.pool.release(self.connection)
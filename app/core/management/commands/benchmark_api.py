@@ -0,0 +1,278 @@
+"""
+Django command to benchmark the API endpoints against seeded data.
+"""
+import json
+import math
+import random
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import (
+    connection,
+    transaction,
+)
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import seeding
+
+
+PASSWORD = 'benchmark-pass-123'
+
+# the metrics compared with the baseline. p99 is recorded too, but
+#  with a few dozen requests it's one slow request, so too noisy to
+#  fail on.
+GATED_TIMINGS = ['p50_ms', 'p95_ms']
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of values."""
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def find_regressions(results, baseline, tolerance):
+    """Return a message for each result worse than its baseline."""
+    regressions = []
+    for size, endpoints in baseline.items():
+        for name, before in endpoints.items():
+            after = results.get(size, {}).get(name)
+            if after is None:
+                continue
+            # query counts don't depend on the machine, so any more
+            #  is a regression
+            if after['queries'] > before['queries']:
+                regressions.append(
+                    f'{size} {name}: queries {before["queries"]} -> '
+                    f'{after["queries"]}'
+                )
+            for metric in GATED_TIMINGS + ['alloc_kib']:
+                if after[metric] > before[metric] * (1 + tolerance):
+                    regressions.append(
+                        f'{size} {name}: {metric} {before[metric]:.2f} -> '
+                        f'{after[metric]:.2f}'
+                    )
+    return regressions
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API endpoints."""
+    help = (
+        'Seed a user per size and time the main API endpoints through '
+        'the full middleware and view stack, recording latency '
+        'percentiles, queries and allocations per request. Data is '
+        'seeded in a transaction that is rolled back afterwards. '
+        'Compare with a previous --output using --baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10,1000,100000',
+            help='Comma separated numbers of recipes to seed per user.',
+        )
+        parser.add_argument('--tags', type=int, default=100)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Timed requests per endpoint.',
+        )
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--alloc-requests',
+            type=int,
+            default=5,
+            help='Requests per endpoint traced for allocations, separately '
+                 'from the timed ones as tracing slows them down.',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--response-cache',
+            action='store_true',
+            help='Keep the response cache on, so repeated reads are hits.',
+        )
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument(
+            '--baseline',
+            help='JSON results to compare with. Fails on a regression.',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Fraction a timing or allocation may grow by.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if not options['response_cache']:
+            # every read goes to the database, as a cache miss would
+            overrides['CACHES'] = {
+                **settings.CACHES,
+                'benchmark': {
+                    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+                },
+            }
+            overrides['RESPONSE_CACHE'] = {
+                **settings.RESPONSE_CACHE,
+                'CACHE': 'benchmark',
+            }
+
+        results = {}
+        self.stdout.write(
+            f"{'recipes':>8} {'endpoint':<14} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'queries':>8} {'alloc KiB':>10}"
+        )
+        with override_settings(**overrides):
+            for size in (int(n) for n in options['sizes'].split(',')):
+                with transaction.atomic():
+                    results[str(size)] = self.run_size(size, options)
+                    # throw the seeded data away
+                    transaction.set_rollback(True)
+                for name, result in results[str(size)].items():
+                    self.stdout.write(
+                        f'{size:>8} {name:<14} {result["p50_ms"]:>8.2f} '
+                        f'{result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f} '
+                        f'{result["queries"]:>8} {result["alloc_kib"]:>10.1f}'
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = find_regressions(
+                results,
+                baseline,
+                options['tolerance'],
+            )
+            if regressions:
+                raise CommandError(
+                    'Regressed against the baseline:\n'
+                    + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('No regressions.'))
+
+    def run_size(self, size, options):
+        """Seed one user and return the results for each endpoint."""
+        rng = random.Random(options['seed'])
+        email = f'benchmark-{size}@example.com'
+        user = seeding.seed_user(
+            email,
+            size,
+            options['tags'],
+            rng,
+            tags_per_recipe=options['tags_per_recipe'],
+            password=PASSWORD,
+        )
+        seeding.analyze()
+        recipe_ids = list(
+            user.recipe_set.values_list('id', flat=True)[:1000]
+        )
+        tag = user.tag_set.order_by('id').first()
+        # before tag_update renames it
+        tag_name = tag.name
+
+        client = APIClient()
+        res = client.post(
+            reverse('user:token'),
+            {'email': email, 'password': PASSWORD},
+        )
+        # the real authentication, not force_authenticate
+        client.credentials(HTTP_AUTHORIZATION=f'Token {res.data["token"]}')
+        counter = iter(range(10 ** 9))
+
+        requests = {
+            'recipe_list': lambda: client.get(
+                reverse('recipe:recipe-list'),
+            ),
+            'recipe_detail': lambda: client.get(reverse(
+                'recipe:recipe-detail',
+                args=[rng.choice(recipe_ids)],
+            )),
+            'recipe_create': lambda: client.post(
+                reverse('recipe:recipe-list'),
+                {
+                    'title': f'Benchmark {next(counter)}',
+                    'time_minutes': 10,
+                    'price': '5.00',
+                    # an existing tag and a new one
+                    'tags': [
+                        {'name': tag_name},
+                        {'name': f'New tag {next(counter)}'},
+                    ],
+                },
+                format='json',
+            ),
+            'tag_list': lambda: client.get(reverse('recipe:tag-list')),
+            'tag_update': lambda: client.patch(
+                reverse('recipe:tag-detail', args=[tag.id]),
+                {'name': f'Renamed tag {next(counter)}'},
+            ),
+            'token_login': lambda: APIClient().post(
+                reverse('user:token'),
+                {'email': email, 'password': PASSWORD},
+            ),
+            'me': lambda: client.get(reverse('user:me')),
+        }
+        return {
+            name: self.measure(name, request, options)
+            for name, request in requests.items()
+        }
+
+    def measure(self, name, request, options):
+        """Return latency, query and allocation figures for a request."""
+        for _ in range(options['warmup']):
+            self.check_response(name, request())
+
+        timings = []
+        queries = []
+        for _ in range(options['requests']):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.check_response(name, response)
+            queries.append(len(captured.captured_queries))
+
+        allocations = []
+        tracemalloc.start()
+        try:
+            for _ in range(options['alloc_requests']):
+                tracemalloc.clear_traces()
+                self.check_response(name, request())
+                allocations.append(tracemalloc.get_traced_memory()[1] / 1024)
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+            'queries': max(queries),
+            'alloc_kib': percentile(allocations, 50) if allocations else 0,
+        }
+
+    def check_response(self, name, response):
+        """Fail rather than time error responses."""
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{name} returned {response.status_code}: '
+                f'{response.content[:200]!r}'
+            )
@@ -0,0 +1,101 @@
+"""
+Django command to benchmark the recipe and tag filters.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import seeding
+from core.models import (
+    Recipe,
+    Tag,
+)
+from recipe.filters import (
+    filter_assigned_tags,
+    filter_recipes_by_tags,
+)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the recipe and tag filters."""
+    help = (
+        'Time ?tags= (any/all) and ?assigned_only= as a user\'s recipe '
+        'and tag counts grow. Data is seeded in a transaction that is '
+        'rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000:50,10000:200,100000:1000',
+            help='Comma separated recipes:tags pairs to seed.',
+        )
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        self.stdout.write(
+            f"{'recipes':>8} {'tags':>6} {'any (ms)':>9} "
+            f"{'all (ms)':>9} {'assigned (ms)':>14}"
+        )
+        for size in options['sizes'].split(','):
+            recipes, tags = (int(n) for n in size.split(':'))
+            with transaction.atomic():
+                timings = self.run_size(recipes, tags, options)
+                # throw the seeded data away
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f'{recipes:>8} {tags:>6} {timings[0]:>9.2f} '
+                f'{timings[1]:>9.2f} {timings[2]:>14.2f}'
+            )
+
+    def run_size(self, recipe_count, tag_count, options):
+        """Seed one user and return median timings for each filter."""
+        rng = random.Random(options['seed'])
+        user = seeding.seed_user(
+            f'benchmark-{recipe_count}-{tag_count}@example.com',
+            recipe_count,
+            tag_count,
+            rng,
+            tags_per_recipe=options['tags_per_recipe'],
+            # only use half the tags so that ?assigned_only has work to do
+            tag_share=0.5,
+        )
+        seeding.analyze()
+
+        assignable = list(Tag.objects.filter(
+            user=user,
+            recipe__isnull=False,
+        ).distinct().order_by('id'))
+        tag_ids = [
+            tag.id for tag in rng.sample(assignable, min(3, len(assignable)))
+        ]
+        user_recipes = Recipe.objects.filter(user=user).order_by('-id')
+        user_tags = Tag.objects.filter(user=user).order_by('-name')
+        # a page, as the API would fetch it
+        return [
+            self.time_query(lambda: filter_recipes_by_tags(
+                user_recipes, tag_ids,
+            )[:100], options['repeat']),
+            self.time_query(lambda: filter_recipes_by_tags(
+                user_recipes, tag_ids, match_all=True,
+            )[:100], options['repeat']),
+            self.time_query(
+                lambda: filter_assigned_tags(user_tags)[:100],
+                options['repeat'],
+            ),
+        ]
+
+    def time_query(self, build_queryset, repeat):
+        """Return the median time in ms to evaluate a queryset."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(build_queryset())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
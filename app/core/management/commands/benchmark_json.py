@@ -0,0 +1,108 @@
+"""
+Django command to compare JSON rendering and parsing backends.
+"""
+import io
+import random
+import statistics
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import (
+    FastJSONRenderer,
+    orjson,
+)
+
+
+def recipe_page(size, tags_per_recipe, rng):
+    """Return a recipe list page shaped like the API's response."""
+    results = []
+    for i in range(size):
+        results.append(OrderedDict([
+            ('id', 100000 - i),
+            ('title', f'Recipe {i} with a reasonably long title'),
+            ('time_minutes', rng.randint(5, 180)),
+            # DecimalField hands prices over as strings
+            ('price', str(Decimal(rng.randint(100, 99999)) / 100)),
+            ('link', f'https://example.com/recipes/{i}'),
+            ('tags', [
+                OrderedDict([('id', tag_id), ('name', f'Tag {tag_id}')])
+                for tag_id in rng.sample(range(1, 500), tags_per_recipe)
+            ]),
+        ]))
+    return OrderedDict([
+        ('next', 'http://localhost:8000/api/recipe/recipes/?cursor=cD0x'),
+        ('previous', None),
+        ('results', results),
+    ])
+
+
+class Command(BaseCommand):
+    """Django command to compare JSON rendering and parsing backends."""
+    help = (
+        'Time the stock json and the orjson based renderer and parser '
+        'on recipe list pages of different sizes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='100,1000',
+            help='Comma separated numbers of recipes per page.',
+        )
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson is not installed, both backends use json.'
+            ))
+        rng = random.Random(options['seed'])
+        repeat = options['repeat']
+
+        self.stdout.write(
+            f"{'recipes':>8} {'KiB':>7} {'render json':>12} "
+            f"{'orjson':>8} {'parse json':>11} {'orjson':>8}  (ms)"
+        )
+        for size in (int(n) for n in options['sizes'].split(',')):
+            page = recipe_page(size, options['tags_per_recipe'], rng)
+            body = JSONRenderer().render(page)
+            # the fast renderer has to produce the same bytes
+            if FastJSONRenderer().render(page) != body:
+                raise CommandError('The renderers disagree.')
+
+            timings = [
+                self.time(lambda: JSONRenderer().render(page), repeat),
+                self.time(lambda: FastJSONRenderer().render(page), repeat),
+                self.time(
+                    lambda: JSONParser().parse(io.BytesIO(body)), repeat,
+                ),
+                self.time(
+                    lambda: FastJSONParser().parse(io.BytesIO(body)), repeat,
+                ),
+            ]
+            self.stdout.write(
+                f'{size:>8} {len(body) / 1024:>7.1f} {timings[0]:>12.3f} '
+                f'{timings[1]:>8.3f} {timings[2]:>11.3f} {timings[3]:>8.3f}'
+            )
+
+    def time(self, func, repeat):
+        """Return the median time in ms to call func."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,40 @@
+"""
+Django command to generate the OpenAPI schema served at /api/schema.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import schema
+
+
+class Command(BaseCommand):
+    """Django command to generate the OpenAPI schema."""
+    help = (
+        'Generate the OpenAPI schema for the current code and save it '
+        'where the schema view reads it from. Run it at build or deploy '
+        'time, so no web process has to generate it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Generate it even if there is one for this code already.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        version = schema.code_hash()
+        if not options['force'] and all(
+            schema.schema_path(fmt).exists() for fmt in schema.RENDERERS
+        ):
+            self.stdout.write(f'Schema {version} is up to date.')
+            return
+
+        started = time.perf_counter()
+        schema.write_schema(schema.generate_schema())
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated schema {version} in '
+            f'{time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,302 @@
+"""
+Django command to bulk import recipes for a user using PostgreSQL COPY.
+"""
+import csv
+import io
+import json
+import time
+from decimal import (
+    Decimal,
+    InvalidOperation,
+)
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import (
+    connection,
+    transaction,
+)
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from recipe.caching import bump_data_version
+
+
+RECIPE_COLUMNS = ['title', 'description', 'time_minutes', 'price', 'link']
+
+# the range of an integer column
+INT_MIN = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+
+
+def read_jsonl(file):
+    """Yield the lines of a JSON lines file, parsed by parse_record."""
+    for line in file:
+        if line.strip():
+            yield line
+
+
+def read_csv(file):
+    """Yield recipe dicts from a CSV file with tags separated by `|`."""
+    for row in csv.DictReader(file):
+        tags = row.get('tags') or ''
+        row['tags'] = [name for name in tags.split('|') if name]
+        yield row
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+# record -> recipe dict, for the formats whose readers don't parse. done
+#  record by record, so a bad one is skipped like any other invalid one.
+PARSERS = {
+    'jsonl': json.loads,
+}
+
+
+def _optional_str(data, field):
+    value = data.get(field)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    return value
+
+
+def clean_recipe(data):
+    """Return (row for the staging table, tag names) or raise ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError('a recipe must be an object')
+    title = _optional_str(data, 'title').strip()
+    if not title:
+        raise ValueError('title is required')
+    description = _optional_str(data, 'description')
+    link = _optional_str(data, 'link')
+    try:
+        time_minutes = data['time_minutes']
+        # int() would take 1.9 and True (as 1)
+        if isinstance(time_minutes, bool) or not isinstance(
+            time_minutes, (int, str),
+        ):
+            raise TypeError('time_minutes must be a whole number')
+        time_minutes = int(time_minutes)
+        price = Decimal(str(data['price'])).quantize(Decimal('0.01'))
+        if price.is_nan():
+            raise ValueError('price is NaN')
+    except (KeyError, TypeError, ValueError, InvalidOperation) as exc:
+        raise ValueError(f'bad time_minutes or price: {exc!r}')
+    # same limits as the model fields, so no row fails the whole batch
+    if not INT_MIN <= time_minutes <= INT_MAX:
+        raise ValueError('time_minutes is out of range')
+    if abs(price) >= 1000:
+        raise ValueError('price must be less than 1000')
+    if len(title) > 255 or len(link) > 255:
+        raise ValueError('title and link are limited to 255 characters')
+
+    # tags may be plain names or {"name": ...} like the API takes them
+    tags = data.get('tags') or []
+    if not isinstance(tags, list):
+        raise ValueError('tags must be a list')
+    names = [
+        tag.get('name') if isinstance(tag, dict) else tag
+        for tag in tags
+    ]
+    if not all(isinstance(name, str) for name in names):
+        raise ValueError('tags must be names or {"name": ...} objects')
+    names = list(dict.fromkeys(name for name in names if name))
+    if any(len(name) > 255 for name in names):
+        raise ValueError('tag names are limited to 255 characters')
+    return (
+        [title, description, time_minutes, price, link],
+        names,
+    )
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes for a user."""
+    help = (
+        'Import recipes and their tags from a JSON lines or CSV file. '
+        'Rows are loaded with COPY into staging tables and merged '
+        'batch by batch. Each batch is committed on its own, so an '
+        'interrupted import can be resumed with --start-batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user that will own the recipes.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='File format. Defaults to the file extension.',
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--start-batch',
+            type=int,
+            default=1,
+            help='Skip the batches before this one (to resume an import).',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}")
+
+        fmt = options['format'] or options['path'].rsplit('.', 1)[-1]
+        if fmt not in READERS:
+            raise CommandError(f'Unknown format {fmt!r}, use --format.')
+        parse = PARSERS.get(fmt)
+        batch_size = options['batch_size']
+        start_batch = options['start_batch']
+
+        imported = 0
+        skipped = 0
+        started = time.perf_counter()
+        with open(options['path'], newline='') as file:
+            records = READERS[fmt](file)
+            batch_no = 0
+            while True:
+                try:
+                    batch = list(islice(records, batch_size))
+                except Exception:
+                    # e.g. a file that isn't UTF-8
+                    self.stderr.write(
+                        f'Reading batch {batch_no + 1} failed. Earlier '
+                        f'batches are committed; resume with '
+                        f'--start-batch {batch_no + 1}.'
+                    )
+                    raise
+                if not batch:
+                    break
+                batch_no += 1
+                if batch_no < start_batch:
+                    continue
+
+                rows = []
+                for offset, record in enumerate(batch):
+                    line_no = (batch_no - 1) * batch_size + offset + 1
+                    try:
+                        data = parse(record) if parse else record
+                        rows.append((line_no, *clean_recipe(data)))
+                    except ValueError as exc:
+                        skipped += 1
+                        self.stderr.write(f'Record {line_no} skipped: {exc}')
+
+                batch_started = time.perf_counter()
+                try:
+                    self.load_batch(user, rows)
+                except Exception:
+                    self.stderr.write(
+                        f'Batch {batch_no} failed. Earlier batches are '
+                        f'committed; resume with --start-batch {batch_no}.'
+                    )
+                    raise
+                elapsed = time.perf_counter() - batch_started
+                imported += len(rows)
+                self.stdout.write(
+                    f'Batch {batch_no}: {len(rows)} recipes in '
+                    f'{elapsed:.2f}s ({len(rows) / elapsed:.0f} rows/sec)'
+                )
+
+        bump_data_version(user)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes ({skipped} skipped) in '
+            f'{elapsed:.2f}s ({imported / elapsed:.0f} rows/sec).'
+        ))
+
+    def load_batch(self, user, rows):
+        """COPY one batch into staging tables and merge it, atomically."""
+        recipe_buffer = io.StringIO()
+        recipe_writer = csv.writer(recipe_buffer)
+        tag_buffer = io.StringIO()
+        tag_writer = csv.writer(tag_buffer)
+        for line_no, recipe, names in rows:
+            recipe_writer.writerow([line_no, *recipe])
+            tag_writer.writerows([line_no, name] for name in names)
+        recipe_buffer.seek(0)
+        tag_buffer.seek(0)
+
+        recipe_table = Recipe._meta.db_table
+        tag_table = Tag._meta.db_table
+        through_table = Recipe.tags.through._meta.db_table
+        columns = ', '.join(RECIPE_COLUMNS)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # the staging tables only live for this transaction
+            cursor.execute('''
+                DROP TABLE IF EXISTS import_recipe_stage;
+                CREATE TEMP TABLE import_recipe_stage (
+                    line_no bigint PRIMARY KEY,
+                    recipe_id bigint,
+                    title varchar(255),
+                    description text,
+                    time_minutes integer,
+                    price numeric(5, 2),
+                    link varchar(255)
+                ) ON COMMIT DROP;
+                DROP TABLE IF EXISTS import_tag_stage;
+                CREATE TEMP TABLE import_tag_stage (
+                    line_no bigint,
+                    name varchar(255)
+                ) ON COMMIT DROP;
+            ''')
+            # in CSV an empty field is NULL unless told otherwise
+            cursor.copy_expert(
+                f'COPY import_recipe_stage (line_no, {columns}) '
+                'FROM STDIN WITH '
+                '(FORMAT csv, FORCE_NOT_NULL (description, link))',
+                recipe_buffer,
+            )
+            cursor.copy_expert(
+                'COPY import_tag_stage (line_no, name) '
+                'FROM STDIN WITH (FORMAT csv)',
+                tag_buffer,
+            )
+
+            # hand out the recipe ids up front so the tags can be
+            #  linked to them by line number
+            cursor.execute(f'''
+                UPDATE import_recipe_stage
+                SET recipe_id = nextval(
+                    pg_get_serial_sequence('{recipe_table}', 'id')
+                )
+            ''')
+            cursor.execute(f'''
+                INSERT INTO {recipe_table} (id, user_id, {columns})
+                SELECT recipe_id, %s, {columns}
+                FROM import_recipe_stage
+                ORDER BY line_no
+            ''', [user.pk])
+            cursor.execute(f'''
+                INSERT INTO {tag_table} (user_id, name)
+                SELECT DISTINCT %s, s.name
+                FROM import_tag_stage s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {tag_table} t
+                    WHERE t.user_id = %s AND t.name = s.name
+                )
+                -- in case the API creates one of them meanwhile
+                ON CONFLICT (user_id, name) DO NOTHING
+            ''', [user.pk, user.pk])
+            cursor.execute(f'''
+                INSERT INTO {through_table} (recipe_id, tag_id)
+                SELECT DISTINCT r.recipe_id, t.id
+                FROM import_tag_stage s
+                JOIN import_recipe_stage r ON r.line_no = s.line_no
+                JOIN {tag_table} t ON t.user_id = %s AND t.name = s.name
+                ON CONFLICT DO NOTHING
+            ''', [user.pk])
@@ -0,0 +1,194 @@
+"""
+Django command to profile how long a worker takes to start.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+
+# run in a fresh interpreter, so nothing is imported already. prints
+#  the time of each phase of a WSGI worker's startup, and each app's
+#  ready(), as JSON.
+STARTUP_SCRIPT = '''
+import json
+import time
+
+started = time.perf_counter()
+phases = {}
+ready = {}
+
+
+def phase(name, since):
+    now = time.perf_counter()
+    phases[name] = (now - since) * 1000
+    return now
+
+
+import django
+from django.apps import config
+from django.conf import settings
+
+settings.INSTALLED_APPS
+now = phase('settings', started)
+
+create = config.AppConfig.create.__func__
+
+
+def create_timed(cls, entry):
+    app_config = create(cls, entry)
+    app_ready = app_config.ready
+
+    def timed_ready():
+        ready_started = time.perf_counter()
+        app_ready()
+        ready[app_config.label] = (time.perf_counter() - ready_started) * 1000
+
+    app_config.ready = timed_ready
+    return app_config
+
+
+config.AppConfig.create = classmethod(create_timed)
+django.setup(set_prefix=False)
+now = phase('apps', now)
+
+from django.urls import get_resolver
+get_resolver().url_patterns
+now = phase('urls', now)
+
+from django.core.handlers.wsgi import WSGIHandler
+WSGIHandler()
+now = phase('middleware', now)
+
+phases['total'] = (now - started) * 1000
+print(json.dumps({'phases': phases, 'ready': ready}))
+'''
+
+PHASES = ['settings', 'apps', 'urls', 'middleware', 'total']
+
+
+def parse_importtime(output):
+    """Return {module: (self us, cumulative us)} from -X importtime."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+class Command(BaseCommand):
+    """Django command to profile how long a worker takes to start."""
+    help = (
+        'Start fresh interpreters with -X importtime and report the time '
+        'to import the settings, set up the apps (with each app\'s '
+        'ready()), import the URLconf and load the middleware, and the '
+        'packages and modules that take longest to import. Give several '
+        'settings modules to compare them, e.g. app.settings and '
+        'app.settings_api.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'settings_modules',
+            nargs='*',
+            help='Defaults to DJANGO_SETTINGS_MODULE.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per settings module. Medians are reported.',
+        )
+        parser.add_argument('--top', type=int, default=15)
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        settings_modules = options['settings_modules'] or [
+            os.environ['DJANGO_SETTINGS_MODULE'],
+        ]
+        # warm the bytecode caches, so the first run isn't compiling
+        self.run(settings_modules[0])
+
+        for settings_module in settings_modules:
+            runs = [
+                self.run(settings_module)
+                for _ in range(options['repeat'])
+            ]
+            self.report(settings_module, runs, options['top'])
+
+    def run(self, settings_module):
+        """Start a worker once and return (timings, modules)."""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module},
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(
+                f'Starting with {settings_module} failed:\n{result.stderr}'
+            )
+        return (
+            json.loads(result.stdout.splitlines()[-1]),
+            parse_importtime(result.stderr),
+        )
+
+    def report(self, settings_module, runs, top):
+        """Write the median timings of runs."""
+        def median(values):
+            return statistics.median(values) if values else 0
+
+        phases = {
+            name: median([timings['phases'][name] for timings, _ in runs])
+            for name in PHASES
+        }
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{settings_module} ({len(runs)} runs, medians)'
+        ))
+        self.stdout.write('  ' + '  '.join(
+            f'{name} {phases[name]:.1f}ms' for name in PHASES
+        ))
+
+        ready = defaultdict(list)
+        for timings, _ in runs:
+            for label, ms in timings['ready'].items():
+                ready[label].append(ms)
+        self.stdout.write('  ready(): ' + ', '.join(
+            f'{label} {median(values):.1f}ms'
+            for label, values in ready.items()
+        ))
+        self.stdout.write(f'  modules imported: {len(runs[0][1])}')
+
+        packages = defaultdict(list)
+        modules = defaultdict(list)
+        for _, imported in runs:
+            totals = defaultdict(int)
+            for name, (self_us, cumulative_us) in imported.items():
+                totals[name.split('.')[0]] += self_us
+                modules[name].append(cumulative_us)
+            for package, self_us in totals.items():
+                packages[package].append(self_us)
+
+        self.stdout.write(f'  {"package":<40} {"self ms":>9}')
+        for package, values in sorted(
+            packages.items(), key=lambda item: -median(item[1]),
+        )[:top]:
+            self.stdout.write(
+                f'  {package:<40} {median(values) / 1000:>9.1f}'
+            )
+        self.stdout.write(f'  {"module":<40} {"cumulative ms":>14}')
+        for name, values in sorted(
+            modules.items(), key=lambda item: -median(item[1]),
+        )[:top]:
+            self.stdout.write(
+                f'  {name:<40} {median(values) / 1000:>14.1f}'
+            )
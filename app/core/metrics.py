@@ -0,0 +1,175 @@
+"""
+Prometheus metrics for the app.
+
+With gunicorn (or any server with several worker processes) set
+PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the workers,
+before they start. Each worker then writes its samples there and
+/metrics adds them up, so it doesn't matter which worker answers.
+Call prometheus_client.multiprocess.mark_process_dead(pid) from the
+server's child exit hook so dead workers' gauges are dropped.
+
+The token cache, connection pools and compression middleware keep their
+own counters, per worker. record_stats() copies them into the metrics
+below, as each worker finishes a request.
+"""
+import threading
+
+from prometheus_client import (
+    Counter,
+    Gauge,
+    Histogram,
+)
+
+
+REQUESTS = Counter(
+    'http_requests_total',
+    'Requests by view, method and status.',
+    ['view', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by view and method.',
+    ['view', 'method'],
+    buckets=(
+        0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+        1.0, 2.5, 5.0, 10.0,
+    ),
+)
+IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'Requests being handled.',
+    # summed over the live workers
+    multiprocess_mode='livesum',
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes',
+    'Response body size (as sent, so after compression) by view.',
+    ['view'],
+    buckets=(
+        100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000,
+        5000000,
+    ),
+)
+DB_QUERIES = Histogram(
+    'db_queries_per_request',
+    'SQL queries run per request by view.',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TIME = Histogram(
+    'db_query_duration_seconds_per_request',
+    'Time spent in SQL queries per request by view.',
+    ['view'],
+    buckets=(
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+    ),
+)
+
+TOKEN_CACHE_LOOKUPS = Counter(
+    'token_cache_lookups_total',
+    'Token cache lookups by result (hit or miss).',
+    ['result'],
+)
+TOKEN_CACHE_ENTRIES = Gauge(
+    'token_cache_entries',
+    'Tokens held in the workers\' caches.',
+    multiprocess_mode='livesum',
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections',
+    'Pooled connections by database and state (in_use or idle).',
+    ['database', 'state'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_MAX_SIZE = Gauge(
+    'db_pool_max_size',
+    'Connections each worker may open, by database.',
+    ['database'],
+    multiprocess_mode='livemax',
+)
+# pool.stats() key -> counter (the client adds the _total)
+DB_POOL_COUNTERS = {
+    name: Counter(f'db_pool_{name}', description, ['database'])
+    for name, description in [
+        ('acquired', 'Connections handed out, by database.'),
+        ('opened', 'Connections opened, by database.'),
+        ('discarded', 'Connections closed rather than reused, by database.'),
+        ('waits', 'Acquires that waited for a free connection.'),
+        ('timeouts', 'Acquires that gave up waiting.'),
+        ('wait_seconds_total', 'Time spent waiting for a free connection.'),
+    ]
+}
+DB_POOL_WAIT_MAX = Gauge(
+    'db_pool_wait_seconds_max',
+    'Longest wait for a free connection, by database.',
+    ['database'],
+    multiprocess_mode='livemax',
+)
+# compression_stats key -> counter
+COMPRESSION_COUNTERS = {
+    name: Counter(f'http_compression_{name}', description, ['encoding'])
+    for name, description in [
+        ('responses', 'Responses compressed, by encoding.'),
+        ('bytes_in', 'Bytes before compression, by encoding.'),
+        ('bytes_out', 'Bytes after compression, by encoding.'),
+    ]
+}
+
+# the totals last copied into each counter, by (counter, labels)
+_recorded = {}
+_recorded_lock = threading.Lock()
+
+
+def _record_total(counter, total, *labels):
+    """Increase counter by however much total grew since last time."""
+    key = (counter, labels)
+    with _recorded_lock:
+        last = _recorded.get(key, 0)
+        _recorded[key] = total
+    # less than last time means the source was reset (e.g. a new pool
+    #  after a fork), so it's all new
+    increase = total - last if total >= last else total
+    if increase:
+        (counter.labels(*labels) if labels else counter).inc(increase)
+
+
+def record_stats(token_cache, pools, compression):
+    """Copy this worker's component stats into the metrics.
+
+    Takes token_cache.stats(), core.db.pool.pool_stats() and
+    compression_stats.get().
+    """
+    _record_total(TOKEN_CACHE_LOOKUPS, token_cache['hits'], 'hit')
+    _record_total(TOKEN_CACHE_LOOKUPS, token_cache['misses'], 'miss')
+    TOKEN_CACHE_ENTRIES.set(token_cache['size'])
+
+    for database, stats in pools.items():
+        DB_POOL_CONNECTIONS.labels(database, 'in_use').set(stats['in_use'])
+        DB_POOL_CONNECTIONS.labels(database, 'idle').set(stats['idle'])
+        DB_POOL_MAX_SIZE.labels(database).set(stats['max_size'])
+        DB_POOL_WAIT_MAX.labels(database).set(stats['wait_seconds_max'])
+        for name, counter in DB_POOL_COUNTERS.items():
+            _record_total(counter, stats[name], database)
+
+    for encoding, stats in compression.items():
+        for name, counter in COMPRESSION_COUNTERS.items():
+            _record_total(counter, stats[name], encoding)
+
+
+def view_name(request):
+    """Return a low-cardinality name for the view that handled request."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # 404s and anything answered before URL resolution
+        return '<unmatched>'
+    func = match.func
+    # DRF's as_view() keeps the class, and viewsets their actions
+    cls = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if cls is None:
+        return match.view_name or func.__name__
+    actions = getattr(func, 'actions', None)
+    if actions:
+        action = actions.get(request.method.lower())
+        if action:
+            return f'{cls.__name__}.{action}'
+    return cls.__name__
@@ -0,0 +1,270 @@
+"""
+Middleware for the project.
+"""
+import re
+import threading
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core import metrics
+from core.authentication import token_cache
+from core.db.pool import pool_stats
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _accepted_encodings(header):
+    """Return {coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        match = re.search(r'q=([0-9.]+)', params)
+        try:
+            q = float(match.group(1)) if match else 1.0
+        except ValueError:
+            q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """Return 'br', 'gzip' or None for an Accept-Encoding header."""
+    accepted = _accepted_encodings(header)
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    # the client's preference first, ours (brotli) to break ties
+    best = max(
+        candidates,
+        key=lambda coding: accepted.get(coding, accepted.get('*', 0)),
+    )
+    if accepted.get(best, accepted.get('*', 0)) <= 0:
+        return None
+    return best
+
+
+class _Compressor:
+    """Incremental gzip or brotli compressor."""
+
+    def __init__(self, encoding):
+        options = settings.COMPRESSION
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(
+                quality=options['BROTLI_QUALITY'],
+            )
+            self._process = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        else:
+            # 16 + MAX_WBITS writes a gzip header and trailer
+            self._compressor = zlib.compressobj(
+                options['GZIP_LEVEL'],
+                zlib.DEFLATED,
+                16 + zlib.MAX_WBITS,
+            )
+            self._process = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def compress(self, data):
+        """Return data compressed in one go."""
+        return self._process(data) + self._finish()
+
+    def compress_chunk(self, data):
+        """Return data compressed and flushed, so the client can use it."""
+        return self._process(data) + self._flush()
+
+    def finish(self):
+        return self._finish()
+
+
+class CompressionStats:
+    """Bytes in and out of the compression middleware, per encoding."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def add(self, encoding, bytes_in, bytes_out, responses=0):
+        with self._lock:
+            stats = self._stats.setdefault(
+                encoding,
+                {'responses': 0, 'bytes_in': 0, 'bytes_out': 0},
+            )
+            stats['responses'] += responses
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+
+    def get(self):
+        """Return the counters, with the ratio of bytes in to bytes out."""
+        with self._lock:
+            return {
+                encoding: {
+                    **stats,
+                    'ratio': (
+                        stats['bytes_in'] / stats['bytes_out']
+                        if stats['bytes_out'] else 0
+                    ),
+                }
+                for encoding, stats in self._stats.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+compression_stats = CompressionStats()
+
+
+def record_component_stats():
+    """Copy this worker's token cache, pool and compression stats."""
+    metrics.record_stats(
+        token_cache.stats(),
+        pool_stats(),
+        compression_stats.get(),
+    )
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with brotli or gzip, as the client accepts.
+
+    Like django's GZipMiddleware, but with brotli, a configurable
+    minimum size, a flush per chunk for streaming responses and
+    compression ratio stats.
+    """
+
+    def process_response(self, request, response):
+        # already encoded, e.g. precompressed static files
+        if response.has_header('Content-Encoding'):
+            return response
+        # not worth the CPU (or the gzip header) for small responses
+        min_length = settings.COMPRESSION['MIN_LENGTH']
+        if not response.streaming and len(response.content) < min_length:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self._compress_stream(
+                encoding,
+                response.streaming_content,
+            )
+            # the compressed size isn't known until it's all sent
+            del response['Content-Length']
+        else:
+            compressed = _Compressor(encoding).compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            compression_stats.add(
+                encoding,
+                len(response.content),
+                len(compressed),
+                responses=1,
+            )
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # the compressed body is a different representation, so a
+        #  strong ETag becomes weak (RFC 7232 section 2.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def _compress_stream(self, encoding, chunks):
+        compressor = _Compressor(encoding)
+        bytes_in = bytes_out = 0
+        for chunk in chunks:
+            if not chunk:
+                continue
+            # each chunk is flushed, so the client can start using
+            #  it (e.g. a line of an export) straight away
+            data = compressor.compress_chunk(chunk)
+            bytes_in += len(chunk)
+            bytes_out += len(data)
+            yield data
+        data = compressor.finish()
+        bytes_out += len(data)
+        compression_stats.add(encoding, bytes_in, bytes_out, responses=1)
+        yield data
+
+
+class _QueryCounter:
+    """Execute wrapper counting queries and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Record Prometheus metrics for every request.
+
+    Goes first in MIDDLEWARE, so the latency covers all of the other
+    middleware and the response size is what goes over the wire.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        queries = _QueryCounter()
+        metrics.IN_FLIGHT.inc()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+                response = self.get_response(request)
+        finally:
+            metrics.IN_FLIGHT.dec()
+
+        view = metrics.view_name(request)
+        metrics.REQUESTS.labels(
+            view, request.method, str(response.status_code),
+        ).inc()
+        metrics.LATENCY.labels(view, request.method).observe(
+            time.perf_counter() - started,
+        )
+        metrics.DB_QUERIES.labels(view).observe(queries.count)
+        metrics.DB_TIME.labels(view).observe(queries.seconds)
+        if response.streaming:
+            response.streaming_content = self._measure_stream(
+                view,
+                response.streaming_content,
+            )
+        else:
+            metrics.RESPONSE_SIZE.labels(view).observe(len(response.content))
+        record_component_stats()
+        return response
+
+    def _measure_stream(self, view, chunks):
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+        metrics.RESPONSE_SIZE.labels(view).observe(size)
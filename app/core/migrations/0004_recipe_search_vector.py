@@ -0,0 +1,106 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# the search document for a recipe: title (weight A), tag names (B) and
+#  description (C). the triggers keep it current whichever way rows are
+#  written (ORM, bulk_create, COPY). existing recipes are filled in
+#  batch by batch by 0011_backfill_recipe_search_vector.
+CREATE_TRIGGERS = '''
+CREATE FUNCTION core_recipe_search_vector(bigint, text, text)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT
+        setweight(to_tsvector('english', coalesce($2, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(t.name, ' ')
+            FROM core_tag t
+            JOIN core_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = $1
+        ), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce($3, '')), 'C')
+$$;
+
+CREATE FUNCTION core_recipe_search_vector_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := core_recipe_search_vector(
+        NEW.id, NEW.title, NEW.description
+    );
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER core_recipe_search_vector
+BEFORE INSERT OR UPDATE OF title, description, search_vector
+ON core_recipe
+FOR EACH ROW EXECUTE FUNCTION core_recipe_search_vector_trigger();
+
+-- when tags are added to or removed from recipes, rebuild those
+--  recipes (once per statement, not once per through row)
+CREATE FUNCTION core_recipe_tags_search_vector_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe SET search_vector = NULL
+    WHERE id IN (SELECT recipe_id FROM changed_rows);
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER core_recipe_tags_search_vector_insert
+AFTER INSERT ON core_recipe_tags
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_tags_search_vector_trigger();
+
+CREATE TRIGGER core_recipe_tags_search_vector_delete
+AFTER DELETE ON core_recipe_tags
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_tags_search_vector_trigger();
+
+-- when a tag is renamed, rebuild the recipes that use it
+CREATE FUNCTION core_tag_search_vector_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe SET search_vector = NULL
+    WHERE id IN (
+        SELECT rt.recipe_id
+        FROM core_recipe_tags rt
+        JOIN new_rows n ON n.id = rt.tag_id
+        JOIN old_rows o ON o.id = n.id
+        WHERE o.name IS DISTINCT FROM n.name
+    );
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER core_tag_search_vector
+AFTER UPDATE ON core_tag
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION core_tag_search_vector_trigger();
+'''
+
+DROP_TRIGGERS = '''
+DROP TRIGGER core_tag_search_vector ON core_tag;
+DROP FUNCTION core_tag_search_vector_trigger();
+DROP TRIGGER core_recipe_tags_search_vector_delete ON core_recipe_tags;
+DROP TRIGGER core_recipe_tags_search_vector_insert ON core_recipe_tags;
+DROP FUNCTION core_recipe_tags_search_vector_trigger();
+DROP TRIGGER core_recipe_search_vector ON core_recipe;
+DROP FUNCTION core_recipe_search_vector_trigger();
+DROP FUNCTION core_recipe_search_vector(bigint, text, text);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_auto_20250721_0049'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_recipe_search_idx'),
+    ]
+
+    # the through table for Recipe.tags is created by Django, so the
+    #  index can't be declared in a model's Meta. the unique
+    #  (recipe_id, tag_id) index already covers lookups from the recipe
+    #  side. this covers lookups from the tag side (tag filters,
+    #  ?assigned_only) with index-only scans.
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+            'core_recipe_tags_tag_recipe_idx '
+            'ON core_recipe_tags (tag_id, recipe_id);',
+            'DROP INDEX CONCURRENTLY IF EXISTS '
+            'core_recipe_tags_tag_recipe_idx;',
+        ),
+    ]
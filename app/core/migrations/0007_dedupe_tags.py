@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_tags_tag_recipe_idx'),
+    ]
+
+    # tags were created with get-then-insert, so racing requests could
+    #  leave a user with the same tag twice. merge those into the oldest
+    #  copy before (user_id, name) is made unique in the next migration.
+    operations = [
+        migrations.RunSQL(
+            '''
+            CREATE TEMP TABLE core_tag_dupes ON COMMIT DROP AS
+            SELECT id, keep_id FROM (
+                SELECT id, min(id) OVER (PARTITION BY user_id, name) keep_id
+                FROM core_tag
+            ) t
+            WHERE id <> keep_id;
+
+            INSERT INTO core_recipe_tags (recipe_id, tag_id)
+            SELECT rt.recipe_id, d.keep_id
+            FROM core_recipe_tags rt
+            JOIN core_tag_dupes d ON d.id = rt.tag_id
+            ON CONFLICT DO NOTHING;
+
+            DELETE FROM core_recipe_tags rt
+            USING core_tag_dupes d WHERE rt.tag_id = d.id;
+
+            DELETE FROM core_tag t
+            USING core_tag_dupes d WHERE t.id = d.id;
+            ''',
+            migrations.RunSQL.noop,
+        ),
+    ]
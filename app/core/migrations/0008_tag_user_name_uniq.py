@@ -0,0 +1,55 @@
+from django.db import (
+    migrations,
+    models,
+)
+from django.contrib.postgres.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_dedupe_tags'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx',
+            ),
+        ),
+        # adding a unique constraint directly builds its index under a
+        #  lock that blocks writes to the table. build the index
+        #  concurrently instead, then turn it into the constraint,
+        #  which only needs a brief lock.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS '
+                    'core_tag_user_name_uniq ON core_tag (user_id, name);',
+                    'DROP INDEX CONCURRENTLY IF EXISTS '
+                    'core_tag_user_name_uniq;',
+                ),
+                migrations.RunSQL(
+                    'ALTER TABLE core_tag ADD CONSTRAINT '
+                    'core_tag_user_name_uniq '
+                    'UNIQUE USING INDEX core_tag_user_name_uniq;',
+                    # this drops the index along with the constraint
+                    'ALTER TABLE core_tag DROP CONSTRAINT '
+                    'core_tag_user_name_uniq;',
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='tag',
+                    constraint=models.UniqueConstraint(
+                        fields=['user', 'name'],
+                        name='core_tag_user_name_uniq',
+                    ),
+                ),
+            ],
+        ),
+    ]
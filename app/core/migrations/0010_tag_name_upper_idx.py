@@ -0,0 +1,26 @@
+from django.contrib.postgres.indexes import OpClass
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import (
+    migrations,
+    models,
+)
+from django.db.models.functions import Upper
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_tag_ordering'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='core_tag_name_upper_idx',
+            ),
+        ),
+    ]
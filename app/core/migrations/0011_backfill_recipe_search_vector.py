@@ -0,0 +1,48 @@
+from django.db import (
+    migrations,
+    transaction,
+)
+
+
+# recipes updated per transaction, so the table is never locked (or
+#  its changes held back from the replicas) for long
+BATCH_SIZE = 10000
+
+
+def backfill_search_vector(apps, schema_editor):
+    # setting search_vector fires the trigger from 0004, which fills it
+    #  in. only the empty ones, so an interrupted run picks up where it
+    #  stopped.
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT min(id), max(id) FROM core_recipe '
+            'WHERE search_vector IS NULL'
+        )
+        first, last = cursor.fetchone()
+    if first is None:
+        return
+    for start in range(first, last + 1, BATCH_SIZE):
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE core_recipe SET search_vector = NULL '
+                'WHERE id >= %s AND id < %s AND search_vector IS NULL',
+                [start, start + BATCH_SIZE],
+            )
+
+
+class Migration(migrations.Migration):
+    # each batch is committed on its own
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_tag_name_upper_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_search_vector,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -2,7 +2,13 @@
 Database models.
 """
 from django.conf import settings
+from django.contrib.postgres.indexes import (
+    GinIndex,
+    OpClass,
+)
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -64,6 +70,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class RecipeManager(models.Manager):
+    """Manager for recipes."""
+
+    def get_queryset(self):
+        # the search vector is only used inside the database,
+        #  so don't send it over the wire with every recipe
+        return super().get_queryset().defer('search_vector')
+
+
 # Note the difference in the base class between this and users.
 #  users, we're overriding some things from a built-in.
 #  with this one, we're creating a model from scratch.
@@ -81,10 +96,48 @@ class Recipe(models.Model):
 
     tags = models.ManyToManyField('Tag')
 
+    # full-text search document built from the title, tag names and
+    #  description. kept up to date by database triggers (see migration
+    #  0004), which also covers bulk inserts and COPY imports.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+            # a user's recipes, newest first, straight off the index
+            #  instead of sorting everything the user owns
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
 
+class TagManager(models.Manager):
+    """Manager for tags."""
+
+    def upsert(self, user, names):
+        """Create tags by name, returning them along with existing ones."""
+        # a single INSERT ... ON CONFLICT, so two requests creating the
+        #  same tag at once both get the one row instead of an error.
+        #  the no-op update is there so RETURNING includes the rows
+        #  that already existed.
+        return list(self.raw(
+            f'''
+            INSERT INTO {self.model._meta.db_table} (user_id, name)
+            SELECT %s, unnest(%s::varchar[])
+            ON CONFLICT (user_id, name) DO UPDATE SET name = EXCLUDED.name
+            RETURNING id, user_id, name
+            ''',
+            [user.pk, list(names)],
+        ))
+
+
 class Tag(models.Model):
     """Tag for filtering recipes."""
     name = models.CharField(max_length=255)
@@ -94,5 +147,26 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = TagManager()
+
+    class Meta:
+        # also the order of a recipe's tags
+        ordering = ['name']
+        constraints = [
+            # also the index behind a user's tags ordered by name
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_uniq',
+            ),
+        ]
+        indexes = [
+            # case-insensitive prefix searches (name__istartswith, as
+            #  the admin does) across every user's tags
+            models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='core_tag_name_upper_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
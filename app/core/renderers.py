@@ -0,0 +1,63 @@
+"""
+JSON renderer built on orjson, when it's installed.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson, falling back to json.
+
+    The output parses to the same data as JSONRenderer's, but isn't
+    always the same bytes: orjson writes some floats differently (1e16
+    rather than 1e+16) and NaN and Infinity as null, where JSONRenderer
+    refuses them. Anything orjson can't encode, like integers over 64
+    bits, is left to JSONRenderer.
+    """
+
+    def _default(self, obj):
+        # anything orjson doesn't do itself (Decimal, lazy strings,
+        #  querysets and, passed through on purpose, datetimes) goes
+        #  through DRF's encoder, so it's encoded the same way
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring."""
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        # orjson always writes compact UTF-8 and can't indent by any
+        #  amount, so leave pretty printing (e.g. the browsable API)
+        #  and non-default settings to the stock renderer
+        if (
+            orjson is None
+            or indent is not None
+            or self.ensure_ascii
+            or not self.compact
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self._default,
+                # int (etc.) keys become strings, as with json
+                option=(
+                    orjson.OPT_PASSTHROUGH_DATETIME
+                    | orjson.OPT_NON_STR_KEYS
+                ),
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # same escaping as JSONRenderer, so the output stays a strict
+        #  javascript subset
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028',
+        ).replace(
+            '\u2029'.encode(), b'\\u2029',
+        )
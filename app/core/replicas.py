@@ -0,0 +1,112 @@
+"""
+Read replica routing.
+
+Views that use ReplicaReadMixin send the queries of their safe (GET,
+HEAD, OPTIONS) requests to a replica. Everything else, including the
+token lookup during authentication, stays on the primary (`default`).
+
+Replicas lag a little behind the primary, so after a user writes
+something they are pinned to the primary for a while (REPLICA_ROUTING
+PIN_SECONDS) and read their own writes.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+
+
+# the replica chosen for a request that may read from one, set for
+#  the duration of the request. chosen once, so all of its reads see
+#  the same (consistently lagging) copy of the data. a context variable
+#  rather than a thread local so it also holds under ASGI.
+_replica = ContextVar('replica', default=None)
+
+
+def get_replica():
+    """Return the alias of a replica to read from, or None."""
+    replicas = settings.REPLICA_ROUTING['REPLICAS']
+    if not replicas:
+        return None
+    return random.choice(replicas)
+
+
+@contextmanager
+def replica_reads():
+    """Send reads inside the block to a replica, the same one each time."""
+    token = _replica.set(get_replica())
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def _cache():
+    return caches[settings.REPLICA_ROUTING['CACHE']]
+
+
+def _pin_key(user):
+    return f'db-pinned:{user.pk}'
+
+
+def pin_to_primary(user):
+    """Send user's reads to the primary for the next PIN_SECONDS."""
+    timeout = settings.REPLICA_ROUTING['PIN_SECONDS']
+    if timeout:
+        _cache().set(_pin_key(user), True, timeout)
+
+
+def is_pinned_to_primary(user):
+    """Return True if user wrote something within PIN_SECONDS."""
+    return _cache().get(_pin_key(user)) is not None
+
+
+class PrimaryReplicaRouter:
+    """Route reads to a replica when allowed, everything else to default."""
+
+    def db_for_read(self, model, **hints):
+        # None means default
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from the primary
+        return db == 'default'
+
+
+class ReplicaReadMixin:
+    """Read from a replica for safe requests, unless the user is pinned."""
+
+    def initial(self, request, *args, **kwargs):
+        # authenticates the user, so this comes first
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method in SAFE_METHODS
+            and request.user.is_authenticated
+            and not is_pinned_to_primary(request.user)
+        ):
+            self._replica_token = _replica.set(get_replica())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            request.method not in SAFE_METHODS
+            and request.user.is_authenticated
+            and status.is_success(response.status_code)
+        ):
+            pin_to_primary(request.user)
+
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _replica.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,186 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema introspects every view and serializer, which
+takes seconds. It only changes when the code does, so it's generated
+once per version of the code (by the generate_schema command, or by the
+first request when live generation is on) and kept on disk and in
+memory, keyed by a hash of the code.
+"""
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+    quote_etag,
+)
+
+import drf_spectacular
+import rest_framework
+from drf_spectacular.renderers import (
+    OpenApiJsonRenderer,
+    OpenApiYamlRenderer,
+)
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import (
+    SCHEMA_KWARGS,
+    SpectacularAPIView,
+)
+
+
+RENDERERS = {
+    'yaml': OpenApiYamlRenderer,
+    'json': OpenApiJsonRenderer,
+}
+
+# settings of the swagger UI page, which don't change the schema. left
+#  out of the hash, so they can differ between the build that generates
+#  the schema and the servers.
+UI_SETTINGS = {
+    'SWAGGER_UI_DIST',
+    'SWAGGER_UI_FAVICON_HREF',
+    'SWAGGER_UI_SETTINGS',
+}
+
+_documents = {}
+_lock = threading.Lock()
+
+
+class SchemaNotGenerated(Exception):
+    """There's no schema for this code and live generation is off."""
+
+
+@lru_cache(maxsize=None)
+def code_hash():
+    """Return a hash of everything the schema is generated from."""
+    digest = hashlib.sha256()
+    # the versions of the libraries doing the generating...
+    for module in (django, rest_framework, drf_spectacular):
+        digest.update(f'{module.__name__}={module.__version__}'.encode())
+    # ...their settings (some may come from the environment)...
+    digest.update(repr(settings.REST_FRAMEWORK).encode())
+    digest.update(repr(sorted(
+        (name, value)
+        for name, value in settings.SPECTACULAR_SETTINGS.items()
+        if name not in UI_SETTINGS
+    )).encode())
+    # ...and our source, bar the tests
+    base_dir = Path(settings.BASE_DIR)
+    for path in sorted(base_dir.rglob('*.py')):
+        relative = path.relative_to(base_dir)
+        if 'tests' in relative.parts:
+            continue
+        digest.update(str(relative).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def schema_path(fmt, version=None):
+    """Return where the schema for a version of the code is kept."""
+    return (
+        Path(settings.SCHEMA_CACHE['DIR'])
+        / f'schema-{version or code_hash()}.{fmt}'
+    )
+
+
+def generate_schema():
+    """Return the schema rendered in each format, as {format: bytes}."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(
+        urlconf=spectacular_settings.SERVE_URLCONF,
+    )
+    schema = generator.get_schema(
+        request=None,
+        public=spectacular_settings.SERVE_PUBLIC,
+    )
+    return {
+        fmt: renderer().render(schema, renderer.media_type)
+        for fmt, renderer in RENDERERS.items()
+    }
+
+
+def write_schema(documents):
+    """Save rendered schema documents for the current code."""
+    os.makedirs(settings.SCHEMA_CACHE['DIR'], exist_ok=True)
+    for fmt, content in documents.items():
+        path = schema_path(fmt)
+        # written aside and renamed, so a reader never sees half a file
+        tmp_path = path.with_suffix(f'.{fmt}.{os.getpid()}.tmp')
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+
+
+def get_schema(fmt):
+    """Return the rendered schema for the current code in fmt.
+
+    Read from memory, then disk, then generated when allowed.
+    """
+    key = (code_hash(), fmt)
+    if key in _documents:
+        return _documents[key]
+    # one thread generates, the others wait for it
+    with _lock:
+        if key in _documents:
+            return _documents[key]
+        try:
+            _documents[key] = schema_path(fmt).read_bytes()
+        except FileNotFoundError:
+            if not settings.SCHEMA_CACHE['LIVE']:
+                raise SchemaNotGenerated(
+                    'Run the generate_schema command to serve the schema.'
+                )
+            for document_fmt, content in generate_schema().items():
+                _documents[(code_hash(), document_fmt)] = content
+    return _documents[key]
+
+
+def clear():
+    """Forget the schema kept in memory."""
+    _documents.clear()
+    code_hash.cache_clear()
+
+
+class SchemaView(SpectacularAPIView):
+    """The OpenAPI schema, precomputed."""
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        live = settings.SCHEMA_CACHE['LIVE']
+        if settings.USE_I18N and request.GET.get('lang') and live:
+            # translations aren't kept, so generated every time
+            return super().get(request, *args, **kwargs)
+
+        try:
+            content = get_schema(request.accepted_renderer.format)
+        except SchemaNotGenerated as exc:
+            return HttpResponse(
+                str(exc),
+                status=503,
+                content_type='text/plain',
+            )
+
+        response = HttpResponse(
+            content,
+            content_type=request.accepted_renderer.media_type,
+        )
+        response['ETag'] = quote_etag(hashlib.md5(content).hexdigest())
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.SCHEMA_CACHE['MAX_AGE'],
+        )
+        # yaml or json, by the Accept header
+        patch_vary_headers(response, ['Accept'])
+        return get_conditional_response(
+            request,
+            etag=response['ETag'],
+            response=response,
+        )
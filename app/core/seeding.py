@@ -0,0 +1,278 @@
+"""
+Bulk seeding of users, recipes and tags for benchmarks and local data.
+"""
+import io
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import (
+    connection,
+    transaction,
+)
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+
+
+BATCH_SIZE = 5000
+
+ADJECTIVES = [
+    'Spicy', 'Creamy', 'Smoky', 'Crispy', 'Roasted', 'Slow-cooked',
+    'Grilled', 'Lemony', 'Garlicky', 'Sticky', 'Easy', 'Classic',
+    'Rustic', 'Quick', 'Herby', 'Golden', 'Hearty', 'Zesty',
+]
+INGREDIENTS = [
+    'chicken', 'beef', 'lamb', 'salmon', 'prawn', 'tofu', 'chickpea',
+    'lentil', 'mushroom', 'aubergine', 'squash', 'tomato', 'spinach',
+    'potato', 'halloumi', 'pork', 'cauliflower', 'sweet potato', 'leek',
+    'coconut', 'chorizo', 'feta', 'pea', 'broccoli', 'apple', 'lemon',
+]
+DISHES = [
+    'curry', 'stew', 'soup', 'salad', 'pie', 'risotto', 'tacos', 'traybake',
+    'pasta', 'noodles', 'stir-fry', 'tart', 'burger', 'gratin', 'bowl',
+    'skewers', 'crumble', 'frittata', 'dhal', 'chilli', 'bake', 'fritters',
+]
+STEPS = [
+    'Heat the oil in a large pan over a medium heat.',
+    'Add the onion and cook for 5 minutes until soft.',
+    'Stir in the garlic and spices and cook for a minute more.',
+    'Season well with salt and pepper.',
+    'Pour in the stock and bring to a simmer.',
+    'Cover and cook gently for 20 minutes, stirring now and then.',
+    'Preheat the oven to 200C/180C fan.',
+    'Tip everything into a roasting tin and toss to coat.',
+    'Roast for 25-30 minutes until golden and cooked through.',
+    'Meanwhile, cook the rice following the pack instructions.',
+    'Scatter over the herbs and serve with lemon wedges.',
+    'Leave to rest for 5 minutes before slicing.',
+    'Whisk the dressing ingredients together in a small bowl.',
+    'Fold through the spinach until just wilted.',
+]
+TAG_NAMES = [
+    'Vegan', 'Vegetarian', 'Dessert', 'Breakfast', 'Lunch', 'Dinner',
+    'Quick', 'Healthy', 'Gluten free', 'Dairy free', 'Batch cooking',
+    'Freezable', 'Budget', 'Family', 'Spicy', 'Comfort food', 'Summer',
+    'Winter', 'Baking', 'Slow cooker', 'One pot', 'Low calorie',
+    'High protein', 'Party', 'Kids', 'Italian', 'Indian', 'Mexican',
+    'Thai', 'Japanese', 'Chinese', 'French', 'Middle Eastern', 'Greek',
+    'Barbecue', 'Christmas', 'Easter', 'Picnic', 'Brunch', 'Snack',
+]
+
+# the shape of a pareto distribution where ~80% of the total belongs
+#  to ~20% of the users
+PARETO_SHAPE = 1.16
+
+
+class Distribution:
+    """Whole numbers drawn as 'N', 'MIN-MAX' or 'pareto:MIN-MAX'.
+
+    N is always N, MIN-MAX is uniform and pareto:MIN-MAX is heavy
+    tailed: mostly close to MIN, with a few up to MAX.
+    """
+
+    def __init__(self, minimum, maximum, kind='uniform'):
+        if minimum < 0 or maximum < minimum:
+            raise ValueError(f'Bad range {minimum}-{maximum}.')
+        self.minimum = minimum
+        self.maximum = maximum
+        self.kind = kind
+
+    @classmethod
+    def parse(cls, spec):
+        """Return the distribution described by spec."""
+        kind, _, bounds = spec.rpartition(':')
+        if kind not in ('', 'pareto'):
+            raise ValueError(f'Unknown distribution {kind!r}.')
+        minimum, _, maximum = bounds.partition('-')
+        minimum = int(minimum)
+        maximum = int(maximum) if maximum else minimum
+        return cls(minimum, maximum, kind or 'uniform')
+
+    def sample(self, rng):
+        """Return a number drawn with rng."""
+        if self.kind == 'pareto':
+            value = int(self.minimum * rng.paretovariate(PARETO_SHAPE))
+            return min(max(value, self.minimum), self.maximum)
+        return rng.randint(self.minimum, self.maximum)
+
+
+def recipe_title(rng):
+    """Return a made up recipe title."""
+    title = (
+        f'{rng.choice(ADJECTIVES)} {rng.choice(INGREDIENTS)} '
+        f'{rng.choice(DISHES)}'
+    )
+    if rng.random() < 0.4:
+        title += f' with {rng.choice(INGREDIENTS)}'
+    return title
+
+
+def recipe_description(rng):
+    """Return a made up method, blank for about a quarter of recipes."""
+    if rng.random() < 0.25:
+        return ''
+    return ' '.join(rng.choices(STEPS, k=rng.randint(2, 12)))
+
+
+def tag_name(index):
+    """Return the name of a user's index'th tag, unique per user."""
+    name = TAG_NAMES[index % len(TAG_NAMES)]
+    if index >= len(TAG_NAMES):
+        name += f' {index // len(TAG_NAMES) + 1}'
+    return name
+
+
+def reserve_ids(model, count):
+    """Take count ids from model's id sequence and return the first.
+
+    Rows can then be copied in with their ids known up front. Not safe
+    to run alongside other inserts into the table.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+            "nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+            [table, table, count],
+        )
+        last = cursor.fetchone()[0]
+    return last - count + 1
+
+
+def _copy_value(value):
+    """Return value in COPY's text format."""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def copy_rows(table, columns, rows):
+    """Insert rows into table with COPY, much faster than INSERTs."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote(table)} ({", ".join(map(quote, columns))}) '
+            f'FROM STDIN',
+            buffer,
+        )
+
+
+def seed_users(users, rng, recipes_per_user, tags_per_user,
+               tags_per_recipe, batch_size=BATCH_SIZE, tag_share=1.0):
+    """Write tags and recipes for saved users and return their counts.
+
+    The counts are Distributions. Rows are written with COPY, batch_size
+    recipes per transaction, with ids reserved up front, so don't run it
+    alongside other inserts. Recipes are only given the first tag_share
+    of a user's tags, the rest are left unused. The same rng state gives
+    the same recipes, tags and tag assignments.
+    """
+    tag_counts = [tags_per_user.sample(rng) for _ in users]
+    recipe_counts = [recipes_per_user.sample(rng) for _ in users]
+
+    tag_id = reserve_ids(Tag, sum(tag_counts) or 1)
+    tag_rows = []
+    user_tag_ids = []
+    for user, count in zip(users, tag_counts):
+        assignable = max(1, int(count * tag_share)) if count else 0
+        user_tag_ids.append(range(tag_id, tag_id + assignable))
+        tag_rows.extend(
+            (tag_id + i, user.id, tag_name(i)) for i in range(count)
+        )
+        tag_id += count
+    copy_rows(Tag._meta.db_table, ['id', 'user_id', 'name'], tag_rows)
+
+    recipe_id = reserve_ids(Recipe, sum(recipe_counts) or 1)
+    recipe_rows = []
+    through_rows = []
+    for user, count, tag_ids in zip(users, recipe_counts, user_tag_ids):
+        for _ in range(count):
+            recipe_rows.append((
+                recipe_id,
+                user.id,
+                recipe_title(rng),
+                recipe_description(rng),
+                rng.randint(5, 180),
+                Decimal(rng.randint(100, 5000)) / 100,
+                (
+                    f'https://example.com/recipes/{recipe_id}'
+                    if rng.random() < 0.5 else ''
+                ),
+            ))
+            per_recipe = min(tags_per_recipe.sample(rng), len(tag_ids))
+            through_rows.extend(
+                (recipe_id, tag) for tag in rng.sample(tag_ids, per_recipe)
+            )
+            recipe_id += 1
+            if len(recipe_rows) >= batch_size:
+                _write_recipes(recipe_rows, through_rows)
+                recipe_rows = []
+                through_rows = []
+    _write_recipes(recipe_rows, through_rows)
+    return sum(recipe_counts), len(tag_rows)
+
+
+def _write_recipes(recipe_rows, through_rows):
+    """Write a batch of recipes and their tags in one transaction."""
+    if not recipe_rows:
+        return
+    through = Recipe.tags.through
+    with transaction.atomic():
+        # the tags first (the foreign keys are only checked on commit),
+        #  so the recipes' search vectors are built once, on insert,
+        #  with their tags, rather than again by the through table's
+        #  trigger
+        copy_rows(through._meta.db_table, ['recipe_id', 'tag_id'],
+                  through_rows)
+        copy_rows(
+            Recipe._meta.db_table,
+            ['id', 'user_id', 'title', 'description', 'time_minutes',
+             'price', 'link'],
+            recipe_rows,
+        )
+
+
+def seed_user(email, recipe_count, tag_count, rng, tags_per_recipe=3,
+              password=None, batch_size=BATCH_SIZE, tag_share=1.0):
+    """Create a user with exactly these counts and return the user.
+
+    See seed_users.
+    """
+    user = get_user_model().objects.create_user(
+        email=email,
+        password=password,
+    )
+    seed_users(
+        [user],
+        rng,
+        Distribution(recipe_count, recipe_count),
+        Distribution(tag_count, tag_count),
+        Distribution(tags_per_recipe, tags_per_recipe),
+        batch_size=batch_size,
+        tag_share=tag_share,
+    )
+    return user
+
+
+def analyze():
+    """Refresh the planner statistics of the seeded tables."""
+    through = Recipe.tags.through
+    with connection.cursor() as cursor:
+        # fresh statistics, as autovacuum would have in production
+        cursor.execute(
+            f'ANALYZE {Recipe._meta.db_table}, {Tag._meta.db_table}, '
+            f'{through._meta.db_table}'
+        )
@@ -1,12 +1,20 @@
 """
 Tests for the Django admin modifications.
 """
+from decimal import Decimal
 
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.test import Client
 
+from core.models import (
+    Recipe,
+    Tag,
+)
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django admin."""
@@ -48,3 +56,104 @@ class AdminSiteTests(TestCase):
         res = self. client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class RecipeTagAdminTests(TestCase):
+    """Tests for the recipe and tag admin pages."""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_login(self.admin_user)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Spicy lentil curry',
+            time_minutes=30,
+            price=Decimal('4.50'),
+        )
+        self.recipe.tags.add(self.vegan)
+
+    def test_recipes_list(self):
+        """Test recipes are listed with their owners."""
+        res = self.client.get(reverse('admin:core_recipe_changelist'))
+
+        self.assertContains(res, self.recipe.title)
+        self.assertContains(res, self.user.email)
+
+    def test_recipes_list_query_count(self):
+        """Test the owners don't cost a query per recipe."""
+        url = reverse('admin:core_recipe_changelist')
+        self.client.get(url)
+        for i in range(5):
+            Recipe.objects.create(
+                user=get_user_model().objects.create_user(
+                    email=f'user{i}@example.com',
+                ),
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('1.00'),
+            )
+
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        Recipe.objects.create(
+            user=get_user_model().objects.create_user(
+                email='another@example.com',
+            ),
+            title='Another',
+            time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+
+        self.assertEqual(
+            len(after.captured_queries),
+            len(before.captured_queries),
+        )
+
+    def test_recipes_search(self):
+        """Test recipes are searched by their search vector."""
+        other = Recipe.objects.create(
+            user=self.user,
+            title='Chocolate cake',
+            time_minutes=60,
+            price=Decimal('8.00'),
+        )
+
+        res = self.client.get(
+            reverse('admin:core_recipe_changelist'),
+            {'q': 'curries'},
+        )
+
+        self.assertContains(res, self.recipe.title)
+        self.assertNotContains(res, other.title)
+
+    def test_edit_recipe_page(self):
+        """Test the recipe page only renders the recipe's own tags."""
+        url = reverse('admin:core_recipe_change', args=[self.recipe.id])
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'Vegan')
+        self.assertNotContains(res, 'Dessert')
+
+    def test_tags_search(self):
+        """Test tags are searched by the start of their name."""
+        res = self.client.get(
+            reverse('admin:core_tag_changelist'),
+            {'q': 'veg'},
+        )
+
+        self.assertContains(res, 'Vegan')
+        self.assertNotContains(res, 'Dessert')
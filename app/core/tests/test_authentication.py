@@ -0,0 +1,151 @@
+"""
+Tests for the cached token authentication.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    TokenCache,
+    token_cache,
+)
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are cached and invalidated."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_token_query(self):
+        """Test a cached token doesn't hit the database."""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_invalid_token_not_cached(self):
+        """Test an unknown token is rejected every time."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+
+        for _ in range(2):
+            res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_deleted_token_invalidated(self):
+        """Test deleting a token removes it from the cache."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user removes their token from the cache."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_update_invalidated(self):
+        """Test updating the user through the API refreshes the cache."""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'name': 'New Name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    def test_cached_user_is_a_copy(self):
+        """Test changes to request.user don't leak between requests."""
+        self.client.get(ME_URL)
+        cached = token_cache.get(self.token.key)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.wsgi_request.user, cached.user)
+        self.assertIsNot(res.wsgi_request.user, cached.user)
+
+
+class TokenCacheTests(TestCase):
+    """Test the token LRU itself."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_entries_expire(self):
+        """Test entries are dropped once their TTL runs out."""
+        tokens = TokenCache(max_size=10, ttl=30)
+
+        with patch('core.authentication.time.monotonic', return_value=100):
+            tokens.set('abc', 'token')
+        with patch('core.authentication.time.monotonic', return_value=129):
+            self.assertEqual(tokens.get('abc'), 'token')
+        with patch('core.authentication.time.monotonic', return_value=131):
+            self.assertIsNone(tokens.get('abc'))
+
+    def test_least_recently_used_evicted(self):
+        """Test the oldest entry is evicted when the cache is full."""
+        tokens = TokenCache(max_size=2, ttl=30)
+        tokens.set('a', 1)
+        tokens.set('b', 2)
+        # touch `a` so `b` becomes the least recently used
+        tokens.get('a')
+        tokens.set('c', 3)
+
+        self.assertEqual(tokens.get('a'), 1)
+        self.assertIsNone(tokens.get('b'))
+        self.assertEqual(tokens.get('c'), 3)
+
+    def test_shared_cache(self):
+        """Test a worker falls back to the shared cache."""
+        worker1 = TokenCache(
+            max_size=10,
+            ttl=30,
+            shared_cache='default',
+            shared_ttl=300,
+        )
+        worker2 = TokenCache(
+            max_size=10,
+            ttl=30,
+            shared_cache='default',
+            shared_ttl=300,
+        )
+
+        worker1.set('abc', 'token')
+        self.assertEqual(worker2.get('abc'), 'token')
+        self.assertEqual(worker2.stats()['hits'], 1)
+
+        worker1.delete('abc')
+        worker2.clear()
+        self.assertIsNone(worker2.get('abc'))
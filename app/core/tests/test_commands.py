@@ -2,13 +2,34 @@
 Test custom Django management commands.
 """
 
+import json
+import os
+import random
+import tempfile
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from core.management.commands.profile_startup import parse_importtime
+from core.seeding import (
+    Distribution,
+    seed_user,
+)
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -37,3 +58,410 @@ class CommandTests(SimpleTestCase):
         patched_check.assert_called_with(
             databases=['default']
         )
+
+
+class ImportRecipesTests(TestCase):
+    """Test the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    def write_file(self, suffix, content):
+        """Write content to a temporary file and return its path."""
+        file = tempfile.NamedTemporaryFile(
+            'w',
+            suffix=suffix,
+            delete=False,
+        )
+        with file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_import_jsonl(self):
+        """Test importing recipes and tags from JSON lines."""
+        Tag.objects.create(user=self.user, name='Dinner')
+        path = self.write_file('.jsonl', '\n'.join(json.dumps(r) for r in [
+            {
+                'title': 'Soup',
+                'time_minutes': 10,
+                'price': '2.50',
+                'tags': ['Dinner', 'Hot'],
+            },
+            {
+                'title': 'Salad',
+                'time_minutes': 5,
+                'price': 3,
+                'description': 'Green',
+                'tags': [{'name': 'Cold'}],
+            },
+        ]))
+        out = StringIO()
+
+        call_command('import_recipes', path, user=self.user.email, stdout=out)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([r.title for r in recipes], ['Soup', 'Salad'])
+        self.assertEqual(recipes[1].price, Decimal('3.00'))
+        self.assertEqual(recipes[1].description, 'Green')
+        self.assertEqual(
+            sorted(t.name for t in recipes[0].tags.all()),
+            ['Dinner', 'Hot'],
+        )
+        # the existing tag is reused
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        self.assertIn('rows/sec', out.getvalue())
+
+    def test_import_csv_in_batches(self):
+        """Test importing CSV (as exported) commits batch by batch."""
+        path = self.write_file('.csv', (
+            'id,title,description,time_minutes,price,link,tags\n'
+            '9,One,,1,1.00,,A|B\n'
+            '8,Two,,2,2.00,,B\n'
+            '7,Three,,3,3.00,,\n'
+        ))
+        out = StringIO()
+
+        call_command(
+            'import_recipes',
+            path,
+            user=self.user.email,
+            batch_size=2,
+            stdout=out,
+        )
+
+        self.assertIn('Batch 1: 2 recipes', out.getvalue())
+        self.assertIn('Batch 2: 1 recipes', out.getvalue())
+        titles = Recipe.objects.filter(user=self.user).values_list(
+            'title',
+            flat=True,
+        )
+        self.assertEqual(sorted(titles), ['One', 'Three', 'Two'])
+        tag_b = Tag.objects.get(user=self.user, name='B')
+        self.assertEqual(tag_b.recipe_set.count(), 2)
+
+    def test_resume_from_batch(self):
+        """Test --start-batch skips the batches already imported."""
+        path = self.write_file('.jsonl', '\n'.join(
+            json.dumps({'title': f'R{i}', 'time_minutes': 1, 'price': 1})
+            for i in range(5)
+        ))
+
+        call_command(
+            'import_recipes',
+            path,
+            user=self.user.email,
+            batch_size=2,
+            start_batch=2,
+            stdout=StringIO(),
+        )
+
+        titles = Recipe.objects.filter(user=self.user).values_list(
+            'title',
+            flat=True,
+        )
+        self.assertEqual(sorted(titles), ['R2', 'R3', 'R4'])
+
+    def test_invalid_records_skipped(self):
+        """Test bad records are reported and the rest imported."""
+        path = self.write_file('.jsonl', '\n'.join(json.dumps(r) for r in [
+            {'title': 'Good', 'time_minutes': 1, 'price': 1},
+            {'title': '', 'time_minutes': 1, 'price': 1},
+            {'title': 'No time', 'price': 1},
+            {'title': 'Too pricey', 'time_minutes': 1, 'price': 1000},
+            {'title': 'Too long', 'time_minutes': 2 ** 31, 'price': 1},
+            {'title': 'Too short', 'time_minutes': -2 ** 31 - 1, 'price': 1},
+            {
+                'title': 'Long tag',
+                'time_minutes': 1,
+                'price': 1,
+                'tags': ['x' * 256],
+            },
+        ]))
+        err = StringIO()
+
+        call_command(
+            'import_recipes',
+            path,
+            user=self.user.email,
+            stdout=StringIO(),
+            stderr=err,
+        )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(err.getvalue().count('skipped'), 6)
+        self.assertIn('time_minutes is out of range', err.getvalue())
+        self.assertIn('tag names are limited', err.getvalue())
+
+    def test_malformed_lines_skipped(self):
+        """Test lines that aren't recipe objects are skipped, not fatal."""
+        path = self.write_file('.jsonl', '\n'.join([
+            json.dumps({'title': 'First', 'time_minutes': 1, 'price': 1}),
+            '{"title": "Broken", ',
+            '["x"]',
+            '"s"',
+            '5',
+            json.dumps({
+                'title': 'Bad tag',
+                'time_minutes': 1,
+                'price': 1,
+                'tags': [{'foo': 1}],
+            }),
+            json.dumps({'title': 7, 'time_minutes': 1, 'price': 1}),
+            json.dumps({'title': 'Float', 'time_minutes': 1.5, 'price': 1}),
+            json.dumps({'title': 'Last', 'time_minutes': 2, 'price': 2}),
+        ]))
+        err = StringIO()
+
+        call_command(
+            'import_recipes',
+            path,
+            user=self.user.email,
+            stdout=StringIO(),
+            stderr=err,
+        )
+
+        titles = Recipe.objects.filter(user=self.user).values_list(
+            'title',
+            flat=True,
+        )
+        self.assertEqual(sorted(titles), ['First', 'Last'])
+        self.assertEqual(err.getvalue().count('skipped'), 7)
+        self.assertIn('Record 2 skipped', err.getvalue())
+        self.assertIn('Record 3 skipped: a recipe must be an object',
+                      err.getvalue())
+
+    def test_unknown_user(self):
+        """Test importing for a missing user is an error."""
+        path = self.write_file('.jsonl', '')
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, user='nobody@example.com')
+
+
+class BenchmarkFiltersTests(TestCase):
+    """Test the benchmark_filters command."""
+
+    def test_benchmark_filters(self):
+        """Test the benchmark runs and leaves no data behind."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_filters',
+            sizes='20:4,40:6',
+            repeat=1,
+            stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[1].split()[0], '20')
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BenchmarkJSONTests(SimpleTestCase):
+    """Test the benchmark_json command."""
+
+    def test_benchmark_json(self):
+        """Test the benchmark prints a row per page size."""
+        out = StringIO()
+
+        call_command('benchmark_json', sizes='5,10', repeat=1, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[-2].split()[0], '5')
+        self.assertEqual(lines[-1].split()[0], '10')
+
+
+class BenchmarkAPITests(TestCase):
+    """Test the benchmark_api command."""
+
+    def run_benchmark(self, **options):
+        call_command(
+            'benchmark_api',
+            sizes='5',
+            tags=4,
+            requests=2,
+            warmup=1,
+            alloc_requests=1,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_benchmark_api(self):
+        """Test results are written per size and endpoint, data rolled back."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'results.json')
+
+            self.run_benchmark(output=path)
+
+            with open(path) as f:
+                results = json.load(f)
+        self.assertEqual(
+            sorted(results['5']),
+            ['me', 'recipe_create', 'recipe_detail', 'recipe_list',
+             'tag_list', 'tag_update', 'token_login'],
+        )
+        self.assertEqual(results['5']['recipe_list']['queries'], 3)
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_regression_fails(self):
+        """Test more queries than the baseline is an error."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'baseline.json')
+            with open(path, 'w') as f:
+                json.dump({'5': {'recipe_list': {
+                    'p50_ms': 1000, 'p95_ms': 1000, 'p99_ms': 1000,
+                    'queries': 1, 'alloc_kib': 100000,
+                }}}, f)
+
+            with self.assertRaisesRegex(CommandError, 'recipe_list: queries'):
+                self.run_benchmark(baseline=path)
+
+
+class SeedDataTests(TestCase):
+    """Test the seed_data command."""
+
+    def seed(self, *args):
+        call_command(
+            'seed_data',
+            '--users=3',
+            '--recipes-per-user=4',
+            '--tags-per-user=2-5',
+            '--tags-per-recipe=1-2',
+            *args,
+            stdout=StringIO(),
+        )
+
+    def test_seed_data(self):
+        """Test users, recipes and tags are created as asked."""
+        self.seed()
+
+        users = get_user_model().objects.filter(
+            email__startswith='seed-',
+        ).order_by('id')
+        self.assertEqual(users.count(), 3)
+        self.assertTrue(users[0].check_password('seedpass123'))
+        for user in users:
+            recipes = Recipe.objects.filter(user=user)
+            self.assertEqual(recipes.count(), 4)
+            self.assertTrue(2 <= Tag.objects.filter(user=user).count() <= 5)
+            for recipe in recipes:
+                self.assertIn(recipe.tags.count(), [1, 2])
+                # only the user's own tags
+                self.assertFalse(recipe.tags.exclude(user=user).exists())
+        # kept by the triggers, with the tag names in
+        recipe = Recipe.objects.filter(user=users[0]).first()
+        tag = recipe.tags.first()
+        self.assertIn(
+            recipe,
+            Recipe.objects.filter(search_vector=tag.name.split()[0]),
+        )
+
+    def test_reproducible(self):
+        """Test the same seed gives the same data."""
+        self.seed('--email-prefix=a')
+        self.seed('--email-prefix=b')
+
+        def data(prefix):
+            return list(Recipe.objects.filter(
+                user__email__startswith=f'{prefix}-',
+            ).order_by('id').values_list(
+                'title', 'description', 'time_minutes', 'price',
+            ))
+
+        self.assertEqual(data('a'), data('b'))
+
+    def test_existing_users(self):
+        """Test seeding the same users twice is an error."""
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class DistributionTests(SimpleTestCase):
+    """Test the seeding distributions."""
+
+    def test_parse(self):
+        """Test the distributions are parsed and sampled in range."""
+        rng = random.Random(1)
+        cases = [('7', 7, 7), ('2-9', 2, 9), ('pareto:10-500', 10, 500)]
+        for spec, minimum, maximum in cases:
+            with self.subTest(spec=spec):
+                distribution = Distribution.parse(spec)
+                for _ in range(100):
+                    self.assertTrue(
+                        minimum <= distribution.sample(rng) <= maximum,
+                    )
+
+    def test_invalid(self):
+        """Test bad specs are rejected."""
+        for spec in ['normal:1-2', '9-2', 'x']:
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    Distribution.parse(spec)
+
+
+class SeedUserTests(TestCase):
+    """Test seeding a single user, as the benchmarks do."""
+
+    def test_seed_user(self):
+        """Test the user gets exactly the counts asked for."""
+        user = seed_user(
+            'user@example.com',
+            10,
+            6,
+            random.Random(1),
+            tags_per_recipe=2,
+            tag_share=0.5,
+        )
+
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 10)
+        self.assertEqual(Tag.objects.filter(user=user).count(), 6)
+        for recipe in Recipe.objects.filter(user=user):
+            self.assertEqual(recipe.tags.count(), 2)
+        # half of the tags are left unused
+        self.assertEqual(
+            Tag.objects.filter(user=user, recipe__isnull=False)
+            .distinct().count(),
+            3,
+        )
+
+
+class ProfileStartupTests(SimpleTestCase):
+    """Test the profile_startup command."""
+
+    def test_parse_importtime(self):
+        """Test the -X importtime output is parsed."""
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   encodings.aliases\n'
+            'import time:      1500 |       1620 | encodings\n'
+        )
+
+        self.assertEqual(parse_importtime(output), {
+            'encodings.aliases': (120, 120),
+            'encodings': (1500, 1620),
+        })
+
+    def test_profile_startup(self):
+        """Test the API-only settings start and are reported."""
+        out = StringIO()
+
+        call_command(
+            'profile_startup',
+            'app.settings_api',
+            repeat=1,
+            top=3,
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('app.settings_api', output)
+        self.assertIn('total', output)
+        # left out of the API-only nodes
+        self.assertNotIn('admin', output.splitlines()[2])
@@ -0,0 +1,70 @@
+"""
+Tests for the estimated counts.
+"""
+import random
+
+from django.test import TestCase
+
+from core.counting import (
+    EstimatedCountPaginator,
+    estimate_count,
+    planned_rows,
+)
+from core.models import Recipe
+from core.seeding import (
+    analyze,
+    seed_user,
+)
+
+
+class EstimateCountTests(TestCase):
+    """Test counts are estimated once they're big."""
+
+    def setUp(self):
+        seed_user(
+            'user@example.com',
+            200,
+            0,
+            random.Random(1),
+        )
+        analyze()
+
+    def test_planned_rows(self):
+        """Test the planner's estimate comes from the statistics."""
+        self.assertEqual(planned_rows(Recipe.objects.all()), 200)
+
+    def test_small_count_exact(self):
+        """Test counts under the threshold are exact."""
+        queryset = Recipe.objects.filter(id=Recipe.objects.first().id)
+
+        self.assertEqual(estimate_count(queryset, exact_below=100), (1, True))
+
+    def test_large_count_estimated(self):
+        """Test counts over the threshold are estimated, not counted."""
+        # a count that stops at the threshold, then the estimate
+        with self.assertNumQueries(2):
+            count, is_exact = estimate_count(
+                Recipe.objects.all(),
+                exact_below=100,
+            )
+
+        self.assertEqual(count, 200)
+        self.assertFalse(is_exact)
+
+    def test_empty_result(self):
+        """Test queries that can't match anything count 0."""
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                estimate_count(Recipe.objects.filter(id__in=[])),
+                (0, True),
+            )
+
+    def test_paginator(self):
+        """Test the paginator uses the count for its pages."""
+        with self.settings(COUNT_ESTIMATE={'EXACT_BELOW': 100}):
+            paginator = EstimatedCountPaginator(
+                Recipe.objects.order_by('id'),
+                50,
+            )
+
+            self.assertEqual(paginator.num_pages, 4)
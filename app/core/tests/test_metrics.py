@@ -0,0 +1,191 @@
+"""
+Tests for the Prometheus metrics.
+"""
+import tempfile
+from unittest.mock import (
+    Mock,
+    patch,
+)
+
+from prometheus_client import REGISTRY
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.db.pool import ConnectionPool
+
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+
+def sample(name, **labels):
+    """Return the current value of a metric sample, or 0."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    """Test requests are measured and exported."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    def test_viewset_action_measured(self):
+        """Test a request is counted and timed by view and action."""
+        labels = {'view': 'RecipeViewSet.list', 'method': 'GET'}
+        requests = sample(
+            'http_requests_total', status='200', **labels,
+        )
+        timed = sample('http_request_duration_seconds_count', **labels)
+        sizes = sample(
+            'http_response_size_bytes_sum', view='RecipeViewSet.list',
+        )
+        queries = sample(
+            'db_queries_per_request_sum', view='RecipeViewSet.list',
+        )
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sample('http_requests_total', status='200', **labels),
+            requests + 1,
+        )
+        self.assertEqual(
+            sample('http_request_duration_seconds_count', **labels),
+            timed + 1,
+        )
+        self.assertEqual(
+            sample('http_response_size_bytes_sum', view='RecipeViewSet.list'),
+            sizes + len(res.content),
+        )
+        # the recipes page and its count (no tags to fetch as there are
+        #  no recipes)
+        self.assertEqual(
+            sample('db_queries_per_request_sum', view='RecipeViewSet.list'),
+            queries + 2,
+        )
+
+    def test_api_view_measured(self):
+        """Test views that aren't viewsets are labelled by class."""
+        labels = {'view': 'CreateTokenView', 'method': 'POST'}
+        before = sample('http_requests_total', status='200', **labels)
+
+        self.client.post(TOKEN_URL, {
+            'email': 'user@example.com',
+            'password': 'testpass123',
+        })
+
+        self.assertEqual(
+            sample('http_requests_total', status='200', **labels),
+            before + 1,
+        )
+
+    def test_unmatched_measured(self):
+        """Test 404s share one label instead of one per URL."""
+        labels = {'view': '<unmatched>', 'method': 'GET'}
+        before = sample('http_requests_total', status='404', **labels)
+
+        self.client.get('/no/such/page/')
+
+        self.assertEqual(
+            sample('http_requests_total', status='404', **labels),
+            before + 1,
+        )
+
+    def test_metrics_endpoint(self):
+        """Test the metrics are served in the Prometheus format."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'http_requests_in_flight', res.content)
+        self.assertIn(b'http_request_duration_seconds_bucket', res.content)
+
+    def test_component_stats_exported(self):
+        """Test the token cache, pool and compression stats are served."""
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        misses = sample('token_cache_lookups_total', result='miss')
+        hits = sample('token_cache_lookups_total', result='hit')
+        acquired = sample('db_pool_acquired_total', database='default')
+        gzipped = sample(
+            'http_compression_responses_total', encoding='gzip',
+        )
+        pool = ConnectionPool(Mock(), max_size=4)
+        pool.acquire()
+
+        with patch(
+            'core.middleware.pool_stats',
+            return_value={'default': pool.stats()},
+        ):
+            # a miss, then a hit
+            self.client.get(RECIPES_URL)
+            self.client.get(RECIPES_URL)
+            # big enough to be compressed
+            self.client.get(METRICS_URL, HTTP_ACCEPT_ENCODING='gzip')
+            res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for name in [
+            b'token_cache_lookups_total',
+            b'token_cache_entries',
+            b'db_pool_connections',
+            b'db_pool_acquired_total',
+            b'db_pool_wait_seconds_max',
+            b'http_compression_bytes_out_total',
+        ]:
+            self.assertIn(name, res.content)
+        self.assertEqual(
+            sample('token_cache_lookups_total', result='miss'), misses + 1,
+        )
+        self.assertEqual(
+            sample('token_cache_lookups_total', result='hit'), hits + 1,
+        )
+        self.assertEqual(
+            sample('db_pool_acquired_total', database='default'),
+            acquired + 1,
+        )
+        self.assertEqual(
+            sample('db_pool_connections', database='default', state='in_use'),
+            1,
+        )
+        self.assertEqual(
+            sample('http_compression_responses_total', encoding='gzip'),
+            gzipped + 1,
+        )
+
+    @override_settings(METRICS={'TOKEN': 'secret'})
+    def test_metrics_endpoint_token(self):
+        """Test /metrics needs the token once one is set."""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(
+            METRICS_URL,
+            HTTP_AUTHORIZATION='Bearer secret',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_metrics_endpoint_multiprocess(self):
+        """Test the workers' files are read in multiprocess mode."""
+        with tempfile.TemporaryDirectory() as path, patch.dict(
+            'os.environ', {'PROMETHEUS_MULTIPROC_DIR': path},
+        ):
+            res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,175 @@
+"""
+Tests for the compression middleware.
+"""
+import gzip
+from unittest.mock import patch
+
+import brotli
+
+from django.contrib.auth import get_user_model
+from django.http import (
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.middleware import (
+    CompressionMiddleware,
+    choose_encoding,
+    compression_stats,
+)
+
+
+BODY = b'{"title": "A long recipe description"}\n' * 100
+
+
+def compress(response, accept_encoding='gzip'):
+    """Run response through the middleware and return it."""
+    request = RequestFactory().get(
+        '/',
+        HTTP_ACCEPT_ENCODING=accept_encoding,
+    )
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+class ChooseEncodingTests(SimpleTestCase):
+    """Test Accept-Encoding negotiation."""
+
+    def test_choose_encoding(self):
+        """Test the best encoding both sides support is picked."""
+        cases = [
+            ('gzip, deflate, br', 'br'),
+            ('gzip', 'gzip'),
+            ('br;q=0.5, gzip', 'gzip'),
+            ('gzip;q=0, br;q=0', None),
+            ('*', 'br'),
+            ('identity', None),
+            ('', None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(choose_encoding(header), expected)
+
+    @patch('core.middleware.brotli', None)
+    def test_gzip_without_brotli(self):
+        """Test brotli is only offered when it's installed."""
+        self.assertEqual(choose_encoding('br, gzip'), 'gzip')
+        self.assertIsNone(choose_encoding('br'))
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test responses are compressed."""
+
+    def setUp(self):
+        compression_stats.clear()
+
+    def test_gzip(self):
+        """Test a response is gzipped and the ETag made weak."""
+        response = HttpResponse(BODY)
+        response['ETag'] = '"abc"'
+
+        response = compress(response)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+        self.assertEqual(
+            int(response['Content-Length']),
+            len(response.content),
+        )
+
+    def test_brotli(self):
+        """Test brotli is used when accepted."""
+        response = compress(HttpResponse(BODY), 'gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), BODY)
+
+    def test_small_response_not_compressed(self):
+        """Test responses under the minimum length are left alone."""
+        response = compress(HttpResponse(b'{"id": 1}'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{"id": 1}')
+
+    def test_not_accepted(self):
+        """Test nothing is compressed for clients that don't ask for it."""
+        response = compress(HttpResponse(BODY), '')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_already_encoded(self):
+        """Test responses that already have an encoding are left alone."""
+        response = HttpResponse(BODY)
+        response['Content-Encoding'] = 'br'
+
+        self.assertEqual(compress(response).content, BODY)
+
+    def test_streaming(self):
+        """Test streaming responses are compressed chunk by chunk."""
+        chunks = [BODY, b'', BODY]
+        response = compress(StreamingHttpResponse(iter(chunks)))
+
+        parts = list(response.streaming_content)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        # the first chunk can be decompressed before the rest arrives
+        decompressor = gzip.zlib.decompressobj(16 + gzip.zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(parts[0]), BODY)
+        self.assertEqual(gzip.decompress(b''.join(parts)), BODY * 2)
+
+    def test_ratio(self):
+        """Test the compression ratio is recorded."""
+        compress(HttpResponse(BODY))
+        response = compress(StreamingHttpResponse(iter([BODY])))
+        # counted once the stream has been sent
+        list(response.streaming_content)
+
+        stats = compression_stats.get()['gzip']
+        self.assertEqual(stats['responses'], 2)
+        self.assertEqual(stats['bytes_in'], len(BODY) * 2)
+        self.assertGreater(stats['ratio'], 10)
+
+
+class CompressionApiTests(TestCase):
+    """Test compression works with the cached API responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_weak_etag_revalidates(self):
+        """Test the weak ETag of a compressed list still gives a 304."""
+        url = reverse('recipe:recipe-list')
+        for i in range(20):
+            self.client.post(url, {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '1.00',
+            })
+
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertTrue(res['ETag'].startswith('W/'))
+
+        res = self.client.get(
+            url,
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
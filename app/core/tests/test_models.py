@@ -3,6 +3,7 @@ Tests for modles.
 """
 from decimal import Decimal
 
+from django.db import IntegrityError
 from django.test import TestCase
 # provided by Django to access default user model
 #  best to use this because if the user model is changed in the future,
@@ -94,3 +95,26 @@ class ModelTests(TestCase):
         tag = models.Tag.objects.create(user=user, name="Tag1")
 
         self.assertEquals(str(tag), tag.name)
+
+    def test_tag_names_unique_per_user(self):
+        """Test a user can't have two tags with the same name."""
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(user=other_user, name='Vegan')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Vegan')
+
+    def test_upsert_tags(self):
+        """Test upserting returns existing tags and creates new ones."""
+        user = create_user()
+        existing = models.Tag.objects.create(user=user, name='Vegan')
+
+        tags = models.Tag.objects.upsert(user, ['Vegan', 'Quick'])
+
+        self.assertEqual(
+            {tag.name: tag.id for tag in tags}['Vegan'],
+            existing.id,
+        )
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
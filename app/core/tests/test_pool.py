@@ -0,0 +1,166 @@
+"""
+Tests for the database connection pool.
+"""
+import threading
+
+import psycopg2
+from psycopg2 import extensions
+
+from django.db import (
+    connection,
+    connections,
+)
+from django.test import TestCase
+
+from core.db.pool import (
+    ConnectionPool,
+    PoolTimeout,
+    close_pools,
+)
+from core.db.postgresql_pool.base import DatabaseWrapper
+
+
+class ConnectionPoolTests(TestCase):
+    """Test the connection pool against the test database."""
+
+    def setUp(self):
+        params = connection.get_connection_params()
+        self.connect = lambda: psycopg2.connect(**params)
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.close()
+
+    def make_pool(self, **options):
+        pool = ConnectionPool(self.connect, **options)
+        self.pools.append(pool)
+        return pool
+
+    def test_connection_reused(self):
+        """Test a released connection is handed out again."""
+        pool = self.make_pool()
+        conn = pool.acquire()
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['opened'], 1)
+        self.assertEqual(stats['acquired'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_pool_size_capped(self):
+        """Test acquiring from a full pool times out."""
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_waits_for_released_connection(self):
+        """Test a full pool hands over a connection once it's released."""
+        pool = self.make_pool(max_size=1, timeout=5)
+        conn = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, [conn])
+        timer.start()
+
+        self.assertIs(pool.acquire(), conn)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_seconds_max'], 0)
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection comes back out of its transaction."""
+        pool = self.make_pool()
+        conn = pool.acquire()
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertEqual(
+            conn.info.transaction_status,
+            extensions.TRANSACTION_STATUS_INTRANS,
+        )
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(
+            conn.info.transaction_status,
+            extensions.TRANSACTION_STATUS_IDLE,
+        )
+
+    def test_closed_connection_discarded(self):
+        """Test a closed connection isn't returned to the pool."""
+        pool = self.make_pool()
+        conn = pool.acquire()
+        conn.close()
+        pool.release(conn)
+
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 0)
+        self.assertEqual(stats['discarded'], 1)
+        self.assertIsNot(pool.acquire(), conn)
+
+    def test_dead_connection_replaced(self):
+        """Test a connection dropped by the server fails its health check."""
+        pool = self.make_pool(check_after=0)
+        conn = pool.acquire()
+        pid = conn.get_backend_pid()
+        pool.release(conn)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+        new_conn = pool.acquire()
+
+        self.assertIsNot(new_conn, conn)
+        self.assertNotEqual(new_conn.get_backend_pid(), pid)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_unhealthy_connection_counted_and_forgotten(self):
+        """Test a connection failing its health check is discarded."""
+        pool = self.make_pool()
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()
+
+        new_conn = pool.acquire()
+
+        self.assertIsNot(new_conn, conn)
+        stats = pool.stats()
+        self.assertEqual(stats['discarded'], 1)
+        self.assertEqual(stats['opened'], 2)
+        self.assertEqual(stats['size'], 1)
+        self.assertNotIn(conn, pool._opened_at)
+        self.assertIn(new_conn, pool._opened_at)
+
+
+class PooledBackendTests(TestCase):
+    """Test the pooled database backend."""
+
+    def setUp(self):
+        self.wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'POOL': {'MAX_SIZE': 2}},
+            alias='pooled',
+        )
+        # looked up by alias when the connection is set up
+        connections['pooled'] = self.wrapper
+
+    def tearDown(self):
+        self.wrapper.close()
+        del connections['pooled']
+        close_pools('pooled')
+
+    def test_connection_returned_to_pool_on_close(self):
+        """Test closing and reopening reuses the same connection."""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            pid = cursor.fetchone()[0]
+        self.wrapper.close()
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            self.assertEqual(cursor.fetchone()[0], pid)
+        stats = self.wrapper.pool.stats()
+        self.assertEqual(stats['opened'], 1)
+        self.assertEqual(stats['in_use'], 1)
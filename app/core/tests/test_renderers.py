@@ -0,0 +1,151 @@
+"""
+Tests for the orjson based renderer and parser.
+"""
+import datetime
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+PAYLOAD = {
+    'id': 1,
+    'title': 'Crème brûlée\u2028',
+    'price': Decimal('5.50'),
+    'created': datetime.datetime(
+        2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc,
+    ),
+    'tags': [{'id': 2, 'name': 'Dessert'}],
+    'link': None,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the renderer against JSONRenderer."""
+
+    def test_same_output_as_json_renderer(self):
+        """Test Decimals, datetimes and unicode render identically."""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD),
+        )
+
+    def test_non_str_keys(self):
+        """Test dict keys that aren't strings are written as strings."""
+        data = {1: 'a', 'b': {2: 'c'}}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data),
+            JSONRenderer().render(data),
+        )
+
+    def test_unencodable_falls_back_to_json(self):
+        """Test what orjson can't encode is left to the stock renderer."""
+        for data in [{'id': 2 ** 64}, {'ids': [1, -2 ** 70]}]:
+            with self.subTest(data=data):
+                self.assertEqual(
+                    FastJSONRenderer().render(data),
+                    JSONRenderer().render(data),
+                )
+
+    def test_unknown_type_still_raises(self):
+        """Test a type neither encoder knows is still an error."""
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({'a': object()})
+
+    def test_floats_parse_the_same(self):
+        """Test floats written differently still parse to the same."""
+        data = {'big': 1e16, 'small': 1.5e-7, 'plain': 0.1}
+
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
+
+    def test_indent_falls_back_to_json(self):
+        """Test pretty printing is left to the stock renderer."""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD, media_type),
+            JSONRenderer().render(PAYLOAD, media_type),
+        )
+
+    @patch('core.renderers.orjson', None)
+    def test_without_orjson(self):
+        """Test rendering works when orjson isn't installed."""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD),
+        )
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the parser."""
+
+    def test_parse(self):
+        """Test parsing a JSON body."""
+        data = FastJSONParser().parse(io.BytesIO(b'{"a": [1, "\xc3\xa9"]}'))
+
+        self.assertEqual(data, {'a': [1, 'é']})
+
+    def test_parse_error(self):
+        """Test invalid JSON raises a parse error."""
+        for body in [b'{"a": ', b'{"a": NaN}']:
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+    @patch('core.parsers.orjson', None)
+    def test_without_orjson(self):
+        """Test parsing works when orjson isn't installed."""
+        data = FastJSONParser().parse(io.BytesIO(b'{"a": 1}'))
+
+        self.assertEqual(data, {'a': 1})
+
+
+class FastJSONApiTests(TestCase):
+    """Test the API uses the renderer and parser."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_create_recipe_with_json(self):
+        """Test a JSON request is parsed and the price is kept exact."""
+        payload = {'title': 'Soup', 'time_minutes': 10, 'price': '1.10'}
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.json()['price'], '1.10')
+
+    def test_invalid_json_rejected(self):
+        """Test a malformed body returns a 400."""
+        res = self.client.post(
+            RECIPES_URL,
+            '{"title": ',
+            content_type='application/json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
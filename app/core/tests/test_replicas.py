@@ -0,0 +1,149 @@
+"""
+Tests for read replica routing.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.replicas import (
+    PrimaryReplicaRouter,
+    replica_reads,
+)
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+REPLICA_ROUTING = {
+    'REPLICAS': ['replica_1'],
+    'PIN_SECONDS': 10,
+    'CACHE': 'default',
+}
+
+
+@override_settings(REPLICA_ROUTING=REPLICA_ROUTING)
+class PrimaryReplicaRouterTests(TestCase):
+    """Test the database router."""
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_primary_by_default(self):
+        """Test reads outside of replica_reads use the primary."""
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_reads_go_to_replica(self):
+        """Test reads inside replica_reads use a replica."""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica_1')
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_one_replica_per_block(self):
+        """Test every read inside replica_reads uses the same replica."""
+        with self.settings(REPLICA_ROUTING={
+            **REPLICA_ROUTING,
+            'REPLICAS': ['replica_1', 'replica_2'],
+        }), replica_reads():
+            aliases = {self.router.db_for_read(Recipe) for _ in range(50)}
+
+        self.assertEqual(len(aliases), 1)
+
+    def test_reads_go_to_primary_without_replicas(self):
+        """Test reads use the primary when no replicas are configured."""
+        with self.settings(REPLICA_ROUTING={
+            **REPLICA_ROUTING,
+            'REPLICAS': [],
+        }), replica_reads():
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_migrations_only_on_primary(self):
+        """Test replicas aren't migrated."""
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+
+
+# get_replica is patched to return None (the primary) so that the
+#  tests can tell when a request read from a replica
+@override_settings(REPLICA_ROUTING=REPLICA_ROUTING)
+@patch('core.replicas.get_replica', return_value=None)
+class ReplicaReadMixinTests(TestCase):
+    """Test which requests read from a replica."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_safe_requests_read_from_replica(self, get_replica):
+        """Test listing recipes reads from a replica."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(get_replica.called)
+
+    def test_replica_chosen_once_per_request(self, get_replica):
+        """Test all of a request's reads go to the replica it was given."""
+        # the page, its count and the tags
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price='1.00',
+        ).tags.create(user=self.user, name='Hot')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_replica.call_count, 1)
+
+    def test_writes_use_primary(self, get_replica):
+        """Test creating a recipe doesn't touch a replica."""
+        payload = {'title': 'Soup', 'time_minutes': 10, 'price': '1.00'}
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(get_replica.called)
+
+    def test_user_pinned_to_primary_after_write(self, get_replica):
+        """Test a user reads from the primary right after writing."""
+        payload = {'title': 'Soup', 'time_minutes': 10, 'price': '1.00'}
+        self.client.post(RECIPES_URL, payload)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertFalse(get_replica.called)
+
+    def test_other_users_not_pinned(self, get_replica):
+        """Test a write only pins the user that made it."""
+        payload = {'title': 'Soup', 'time_minutes': 10, 'price': '1.00'}
+        self.client.post(RECIPES_URL, payload)
+
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(other)
+        self.client.get(TAGS_URL)
+
+        self.assertTrue(get_replica.called)
+
+    def test_replica_reads_end_with_request(self, get_replica):
+        """Test reads after the request go to the primary again."""
+        # an alias that exists, as a stand-in for a replica
+        get_replica.return_value = 'default'
+        self.client.get(RECIPES_URL)
+
+        self.assertIsNone(PrimaryReplicaRouter().db_for_read(Recipe))
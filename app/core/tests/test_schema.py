@@ -0,0 +1,141 @@
+"""
+Tests for the precomputed OpenAPI schema.
+"""
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import (
+    SimpleTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework import status
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+)
+
+from core import schema
+
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaViewTests(SimpleTestCase):
+    """Test the schema is generated once and served with caching."""
+
+    def setUp(self):
+        self.client = APIClient()
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.schema_settings = override_settings(SCHEMA_CACHE={
+            'DIR': tmpdir.name,
+            'LIVE': True,
+            'MAX_AGE': 3600,
+        })
+        self.schema_settings.enable()
+        self.addCleanup(self.schema_settings.disable)
+        schema.clear()
+        self.addCleanup(schema.clear)
+
+    def test_same_as_live_schema(self):
+        """Test the served schema is the one SpectacularAPIView makes."""
+        for accept in ['application/vnd.oai.openapi', 'application/json']:
+            with self.subTest(accept=accept):
+                request = APIRequestFactory().get(
+                    SCHEMA_URL,
+                    HTTP_ACCEPT=accept,
+                )
+                expected = SpectacularAPIView.as_view()(request).render()
+
+                res = self.client.get(SCHEMA_URL, HTTP_ACCEPT=accept)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res['Content-Type'], accept)
+                self.assertEqual(res.content, expected.content)
+
+    def test_cache_headers(self):
+        """Test the schema can be cached and revalidated."""
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertIn('max-age=3600', res['Cache-Control'])
+        self.assertIn('Accept', res['Vary'])
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_generated_once(self):
+        """Test the schema is only generated by the first request."""
+        self.client.get(SCHEMA_URL)
+
+        with self.settings_live(False):
+            res = self.client.get(SCHEMA_URL, HTTP_ACCEPT='application/json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_read_from_file(self):
+        """Test the file written by generate_schema is served."""
+        schema.write_schema({'yaml': b'openapi: 3.0.3\n', 'json': b'{}'})
+
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.content, b'openapi: 3.0.3\n')
+
+    def test_live_generation_off(self):
+        """Test nothing is generated when live generation is off."""
+        with self.settings_live(False):
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_new_code_new_schema(self):
+        """Test a change to the code is a different schema version."""
+        old_path = schema.schema_path('yaml')
+
+        with self.settings(SPECTACULAR_SETTINGS={'TITLE': 'Recipes'}):
+            schema.code_hash.cache_clear()
+            self.assertNotEqual(schema.schema_path('yaml'), old_path)
+
+    def test_ui_settings_same_schema(self):
+        """Test the swagger UI settings don't change the schema version."""
+        schema.write_schema({'yaml': b'openapi: 3.0.3\n', 'json': b'{}'})
+        schema.clear()
+
+        with self.settings(SPECTACULAR_SETTINGS={
+            **settings.SPECTACULAR_SETTINGS,
+            'SWAGGER_UI_DIST': '/static/swagger-ui',
+        }), self.settings_live(False):
+            schema.code_hash.cache_clear()
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, b'openapi: 3.0.3\n')
+
+    def settings_live(self, live):
+        return override_settings(SCHEMA_CACHE={
+            **self.schema_settings.options['SCHEMA_CACHE'],
+            'LIVE': live,
+        })
+
+
+class GenerateSchemaTests(SimpleTestCase):
+    """Test the generate_schema command."""
+
+    def test_generate_schema(self):
+        """Test the schema is written once per version of the code."""
+        with tempfile.TemporaryDirectory() as tmpdir, override_settings(
+            SCHEMA_CACHE={'DIR': tmpdir, 'LIVE': False, 'MAX_AGE': 60},
+        ):
+            out = StringIO()
+
+            call_command('generate_schema', stdout=out)
+            call_command('generate_schema', stdout=out)
+
+            self.assertIn(b'openapi', schema.schema_path('yaml').read_bytes())
+            self.assertIn(b'openapi', schema.schema_path('json').read_bytes())
+            self.assertIn('up to date', out.getvalue().splitlines()[-1])
@@ -0,0 +1,45 @@
+"""
+Views for the core app.
+"""
+import os
+
+from django.conf import settings
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+)
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from core.middleware import record_component_stats
+
+
+@require_GET
+def metrics(request):
+    """Return the app's metrics in the Prometheus text format."""
+    token = settings.METRICS['TOKEN']
+    if token and not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {token}',
+    ):
+        return HttpResponseForbidden()
+    # this worker's are recorded after each request, so as of the last
+    record_component_stats()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # added up from the files every worker writes
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry),
+        content_type=CONTENT_TYPE_LATEST,
+    )
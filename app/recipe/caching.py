@@ -0,0 +1,120 @@
+"""
+Per-user response caching for the recipe APIs.
+
+Every user has a data version that changes on each write to their
+recipes or tags. Responses are cached under (user, version, URL), so a
+write makes all of the user's cached responses unreachable without
+having to find and delete them. The cache key doubles as the ETag.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control
+from django.utils.http import (
+    parse_etags,
+    quote_etag,
+)
+
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE['CACHE']]
+
+
+def _version_key(user):
+    return f'recipe-data-version:{user.pk}'
+
+
+def bump_data_version(user):
+    """Start a new data version for user, invalidating their responses."""
+    # a random version rather than a counter, so that a version lost
+    #  from the cache can never come back around to an old ETag
+    version = uuid.uuid4().hex
+    _cache().set(_version_key(user), version, None)
+    return version
+
+
+def get_data_version(user):
+    """Return the current data version for user."""
+    version = _cache().get(_version_key(user))
+    if version is None:
+        version = bump_data_version(user)
+    return version
+
+
+class VersionedCacheMixin:
+    """Cache GET responses per user and answer If-None-Match with 304."""
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Return a cached (or 304) response, calling handler on a miss."""
+        version = get_data_version(request.user)
+        etag = hashlib.md5(
+            ':'.join([
+                str(request.user.pk),
+                version,
+                request.build_absolute_uri(),
+                request.accepted_media_type,
+            ]).encode()
+        ).hexdigest()
+
+        # answered before touching the database. a weak comparison,
+        #  the compression middleware marks the ETag weak.
+        if_none_match = {
+            tag[2:] if tag.startswith('W/') else tag
+            for tag in parse_etags(request.headers.get('If-None-Match', ''))
+        }
+        if quote_etag(etag) in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = f'recipe-response:{etag}'
+            data = _cache().get(cache_key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                _cache().set(
+                    cache_key,
+                    response.data,
+                    settings.RESPONSE_CACHE['TIMEOUT'],
+                )
+
+        response['ETag'] = quote_etag(etag)
+        # clients may keep a copy but must check back with the ETag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # any successful write through the view (create, update, delete
+        #  or custom actions like bulk create) starts a new version
+        if (
+            request.method not in SAFE_METHODS
+            and status.is_success(response.status_code)
+        ):
+            bump_data_version(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class CachedListMixin(VersionedCacheMixin):
+    """Cache the list action."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(VersionedCacheMixin):
+    """Cache the retrieve action."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve,
+            request,
+            *args,
+            **kwargs
+        )
@@ -0,0 +1,102 @@
+"""
+Streaming export of a user's recipes.
+"""
+import csv
+import json
+from collections import defaultdict
+
+from rest_framework.renderers import BaseRenderer
+
+from core.models import Recipe
+
+
+FIELDS = ['id', 'title', 'description', 'time_minutes', 'price', 'link']
+# recipes read (and tags batch-fetched) per query
+CHUNK_SIZE = 2000
+
+
+def iter_recipe_chunks(queryset, chunk_size=None):
+    """Yield lists of recipe rows, newest first, with their tag names."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    queryset = queryset.order_by('-id').values(*FIELDS)
+    last_id = None
+    while True:
+        # keyset chunks (`WHERE id < last_id`) rather than a server-side
+        #  cursor, so every chunk is a short indexed query that also
+        #  works behind a transaction-level connection pooler.
+        chunk = queryset if last_id is None else queryset.filter(
+            id__lt=last_id,
+        )
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return
+
+        # one query for the tags of the whole chunk
+        tags = defaultdict(list)
+        # from the same database as the recipes
+        through = Recipe.tags.through.objects.using(queryset.db).filter(
+            recipe_id__in=[row['id'] for row in rows],
+        ).order_by('tag__name')
+        for recipe_id, name in through.values_list('recipe_id', 'tag__name'):
+            tags[recipe_id].append(name)
+
+        for row in rows:
+            row['price'] = str(row['price'])
+            row['tags'] = tags[row['id']]
+        yield rows
+        last_id = rows[-1]['id']
+
+
+def stream_ndjson(queryset):
+    """Yield the recipes as newline-delimited JSON."""
+    for rows in iter_recipe_chunks(queryset):
+        # one write per chunk rather than per row
+        yield ''.join(
+            json.dumps(row, ensure_ascii=False) + '\n' for row in rows
+        )
+
+
+class _Echo:
+    """File-like object that hands back what's written to it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    """Yield the recipes as CSV, tag names separated by `|`."""
+    writer = csv.writer(_Echo())
+    # send the header straight away, before the first query
+    yield writer.writerow(FIELDS + ['tags'])
+    for rows in iter_recipe_chunks(queryset):
+        yield ''.join(
+            writer.writerow(
+                [row[field] for field in FIELDS] + ['|'.join(row['tags'])]
+            )
+            for row in rows
+        )
+
+
+# these only take part in content negotiation (Accept header or
+#  ?format=). successful exports are streamed, so render() is only
+#  used for error responses.
+class NDJSONRenderer(BaseRenderer):
+    """Renderer for newline-delimited JSON."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode() + b'\n'
+
+
+class CSVRenderer(NDJSONRenderer):
+    """Renderer for CSV."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+STREAMS = {
+    'ndjson': stream_ndjson,
+    'csv': stream_csv,
+}
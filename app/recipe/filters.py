@@ -0,0 +1,37 @@
+"""
+Filters for the recipe APIs.
+"""
+from django.db.models import (
+    Exists,
+    OuterRef,
+)
+
+from core.models import Recipe
+
+
+# these are semi-joins (`WHERE EXISTS (...)`) rather than joins, so a
+#  recipe with several matching tags isn't returned more than once and
+#  no DISTINCT is needed. postgres answers them from the (recipe_id,
+#  tag_id) and (tag_id, recipe_id) indexes on the through table.
+def filter_recipes_by_tags(queryset, tag_ids, match_all=False):
+    """Return recipes with any (or all) of the given tags."""
+    through = Recipe.tags.through.objects
+    if not match_all:
+        return queryset.filter(Exists(through.filter(
+            recipe_id=OuterRef('pk'),
+            tag_id__in=tag_ids,
+        )))
+
+    for tag_id in set(tag_ids):
+        queryset = queryset.filter(Exists(through.filter(
+            recipe_id=OuterRef('pk'),
+            tag_id=tag_id,
+        )))
+    return queryset
+
+
+def filter_assigned_tags(queryset):
+    """Return only tags that are assigned to at least one recipe."""
+    return queryset.filter(Exists(
+        Recipe.tags.through.objects.filter(tag_id=OuterRef('pk'))
+    ))
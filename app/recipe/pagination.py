@@ -0,0 +1,71 @@
+"""
+Pagination for the recipe APIs.
+"""
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from core.counting import estimate_count
+
+
+class CountedCursorPagination(CursorPagination):
+    """Cursor pagination with the number of results in the response.
+
+    `count` is exact below COUNT_ESTIMATE['EXACT_BELOW'] and the
+    planner's estimate above, as `count_is_exact` says, so clients can
+    show "about 1.2M" without a scan of every row.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = super().paginate_queryset(queryset, request, view)
+        if page is not None:
+            self.count, self.count_is_exact = estimate_count(queryset)
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_is_exact', self.count_is_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'] = {
+            'count': {'type': 'integer', 'example': 123},
+            'count_is_exact': {'type': 'boolean'},
+            **response_schema['properties'],
+        }
+        return response_schema
+
+
+# cursor (keyset) pagination filters on the last seen value
+#  (e.g. `WHERE id < 1234`) instead of using OFFSET, so the cost of
+#  a page stays the same no matter how deep the client scrolls.
+#  cursors are opaque (base64) so clients can't craft their own.
+class RecipeCursorPagination(CountedCursorPagination):
+    """Keyset pagination for recipes, newest first."""
+    ordering = ('-id',)
+    # search results are ordered by relevance instead
+    search_ordering = ('-rank', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        if 'rank' in queryset.query.annotations:
+            return self.search_ordering
+        return super().get_ordering(request, queryset, view)
+
+
+class TagCursorPagination(CountedCursorPagination):
+    """Keyset pagination for tags, ordered by name."""
+    # the cursor position is taken from the first field.
+    #  `id` is a tie-breaker so the order is stable.
+    ordering = ('-name', 'id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,162 @@
+"""
+Read-only fast path for list responses.
+
+A ModelSerializer builds a model instance per row and walks its field
+objects for every one of them. For lists, RowSerializer instead reads
+plain values() rows (and one batched query per many-to-many field) and
+runs them through the serializer's own fields, bound once per request.
+Because the same field objects do the formatting, the output is the
+same as the serializer's, and stays so as fields are added or changed.
+"""
+from collections import (
+    OrderedDict,
+    defaultdict,
+)
+
+from django.db import models
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+def _column(field):
+    """Return the model field name behind a serializer field, or None."""
+    if field.source == '*' or len(field.source_attrs) != 1:
+        return None
+    if isinstance(field, (
+        serializers.SerializerMethodField,
+        serializers.HiddenField,
+    )):
+        return None
+    return field.source
+
+
+class RowSerializer:
+    """Serialize values() rows with the fields of a ModelSerializer."""
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        self.model = model
+        # (field name, column, field) for plain fields...
+        self.columns = []
+        # ...and (field name, model field, child field columns) for
+        #  nested many-to-many lists
+        self.related = []
+        # the names in the serializer's order
+        self.field_names = []
+        self.supported = True
+
+        for field in serializer._readable_fields:
+            column = _column(field)
+            if column is None:
+                self.supported = False
+                return
+            if isinstance(field, serializers.ListSerializer):
+                model_field = model._meta.get_field(column)
+                child_columns = [
+                    (child.field_name, _column(child), child)
+                    for child in field.child._readable_fields
+                ]
+                if (
+                    not isinstance(model_field, models.ManyToManyField)
+                    or not isinstance(field.child, serializers.Serializer)
+                    or any(col is None for _, col, _ in child_columns)
+                ):
+                    self.supported = False
+                    return
+                self.related.append((field.field_name, model_field,
+                                     child_columns))
+            elif isinstance(field, serializers.BaseSerializer):
+                self.supported = False
+                return
+            else:
+                self.columns.append((field.field_name, column, field))
+            self.field_names.append(field.field_name)
+
+    def get_queryset(self, queryset):
+        """Return queryset as rows holding just the columns needed."""
+        names = [self.model._meta.pk.name]
+        names += [column for _, column, _ in self.columns]
+        # annotations such as a search rank may be needed for ordering
+        #  and paginating, even though they aren't serialized
+        names += list(queryset.query.annotations)
+        return queryset.prefetch_related(None).values(*dict.fromkeys(names))
+
+    def to_representation(self, rows, using=None):
+        """Return the serialized rows, as the serializer would."""
+        rows = list(rows)
+        pk_name = self.model._meta.pk.name
+        related = {
+            field_name: self._related_rows(
+                model_field,
+                child_columns,
+                [row[pk_name] for row in rows],
+                using,
+            )
+            for field_name, model_field, child_columns in self.related
+        }
+
+        data = []
+        for row in rows:
+            item = {}
+            for field_name, column, field in self.columns:
+                value = row[column]
+                item[field_name] = (
+                    None if value is None else field.to_representation(value)
+                )
+            for field_name in related:
+                item[field_name] = related[field_name][row[pk_name]]
+            data.append(OrderedDict(
+                (field_name, item[field_name])
+                for field_name in self.field_names
+            ))
+        return data
+
+    def _related_rows(self, model_field, child_columns, pks, using):
+        """Return serialized related objects by the pk they belong to."""
+        through = model_field.remote_field.through
+        source = model_field.m2m_field_name()
+        target = model_field.m2m_reverse_field_name()
+        related_model = model_field.related_model
+        # the same order a prefetch of the relation would use
+        ordering = [
+            f'{target}__{name}' if not name.startswith('-')
+            else f'-{target}__{name[1:]}'
+            for name in related_model._meta.ordering
+        ]
+        # from the same database as the rows
+        queryset = through.objects.using(using).filter(
+            **{f'{source}__in': pks},
+        ).order_by(*ordering).values_list(
+            through._meta.get_field(source).attname,
+            *(f'{target}__{column}' for _, column, _ in child_columns),
+        )
+
+        related = defaultdict(list)
+        for pk, *values in queryset:
+            item = OrderedDict()
+            for (field_name, _, field), value in zip(child_columns, values):
+                item[field_name] = (
+                    None if value is None else field.to_representation(value)
+                )
+            related[pk].append(item)
+        return related
+
+
+class RowListMixin:
+    """Serve the list action from values() rows where possible."""
+
+    def list(self, request, *args, **kwargs):
+        rows = RowSerializer(self.get_serializer())
+        if not rows.supported:
+            return super().list(request, *args, **kwargs)
+
+        queryset = rows.get_queryset(self.filter_queryset(self.get_queryset()))
+        # the rows and the related rows come from the same database
+        queryset = queryset.using(queryset.db)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                rows.to_representation(page, queryset.db),
+            )
+        return Response(rows.to_representation(queryset, queryset.db))
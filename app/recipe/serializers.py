@@ -1,14 +1,67 @@
 """
 Serializers for recipe APIs
 """
+from django.db import (
+    IntegrityError,
+    transaction,
+)
+
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
 from core.models import (
     Recipe,
     Tag,
 )
+from recipe.caching import bump_data_version
+
+
+def _param_to_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsMixin:
+    """Let reads pick fields with ?fields=a,b or leave some out with ?omit=."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # only the top-level serializer gets the request in its
+        #  context, so nested ones are left whole. writes always
+        #  validate every field.
+        request = self._context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        fields = request.query_params.get('fields')
+        omit = request.query_params.get('omit')
+        if fields is not None and not _param_to_names(fields):
+            raise serializers.ValidationError({
+                'fields': 'Name at least one field.',
+            })
+        # both checked against the declared fields, before either
+        #  removes any
+        for param, value in (('fields', fields), ('omit', omit)):
+            if value is None:
+                continue
+            unknown = set(_param_to_names(value)) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({
+                    param: f"Unknown fields: {', '.join(sorted(unknown))}.",
+                })
+
+        # trims the SQL too, see the views
+        if fields is not None:
+            keep = set(_param_to_names(fields))
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+        if omit is not None:
+            for name in _param_to_names(omit):
+                # may be gone already, left out of ?fields=
+                self.fields.pop(name, None)
 
-class TagSerializer(serializers.ModelSerializer):
+
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for tags."""
 
     class Meta:
@@ -19,8 +72,68 @@ class TagSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
+    def validate_name(self, value):
+        """Check that renaming doesn't clash with another of the tags."""
+        # nested in a recipe, a name that exists means use that tag
+        if self.parent is not None:
+            return value
+        tags = Tag.objects.filter(user=self.context['request'].user)
+        if self.instance is not None:
+            tags = tags.exclude(pk=self.instance.pk)
+        if tags.filter(name=value).exists():
+            raise serializers.ValidationError(
+                'You already have a tag with this name.'
+            )
+        return value
+
+    def update(self, instance, validated_data):
+        """Rename the tag, unless another took the name meanwhile."""
+        try:
+            # a savepoint, so the request's transaction stays usable
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            # (user, name) is unique, and validate_name's check raced
+            #  with another request
+            raise serializers.ValidationError({
+                'name': ['You already have a tag with this name.'],
+            })
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Serializer for creating many recipes at once."""
+    # rows per insert statement
+    batch_size = 1000
+
+    def create(self, validated_data):
+        """Create recipes, their tags and through rows in bulk."""
+        tags_per_recipe = [attrs.pop('tags', []) for attrs in validated_data]
+        with transaction.atomic():
+            # postgres returns the new ids, so no need to re-query
+            recipes = Recipe.objects.bulk_create(
+                [Recipe(**attrs) for attrs in validated_data],
+                batch_size=self.batch_size,
+            )
+            # resolve the tags of every recipe in one go
+            tag_objs = {
+                tag.name: tag
+                for tag in self.child._get_or_create_tags(
+                    [tag for tags in tags_per_recipe for tag in tags]
+                )
+            }
+            through = Recipe.tags.through
+            through.objects.bulk_create(
+                [
+                    through(recipe_id=recipe.id, tag_id=tag_objs[name].id)
+                    for recipe, tags in zip(recipes, tags_per_recipe)
+                    for name in dict.fromkeys(tag['name'] for tag in tags)
+                ],
+                batch_size=self.batch_size,
+            )
+        return recipes
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
     tags = TagSerializer(many=True, required=False)
 
@@ -35,6 +148,34 @@ class RecipeSerializer(serializers.ModelSerializer):
             'tags',
         ]
         read_only_fields = ['id']
+        # used when instantiated with many=True
+        list_serializer_class = RecipeListSerializer
+
+    def _get_or_create_tags(self, tags):
+        """Return tag objects for the given tags, creating missing ones."""
+        # because this is a serializer and not a view, we need
+        #  to get the user from the request context, which the
+        #  view passes the serializer.
+        auth_user = self.context['request'].user
+        # de-duplicate the names but keep the order they were sent in
+        names = list(dict.fromkeys(tag['name'] for tag in tags))
+        # one query for every tag that already exists...
+        tag_objs = {
+            tag.name: tag
+            for tag in Tag.objects.filter(user=auth_user, name__in=names)
+        }
+        # ...and one upsert for all of the ones that don't, which
+        #  also copes with another request creating them in between.
+        missing = [name for name in names if name not in tag_objs]
+        if missing:
+            tag_objs.update(
+                (tag.name, tag)
+                for tag in Tag.objects.upsert(auth_user, missing)
+            )
+            # the user's tag list changed
+            bump_data_version(auth_user)
+
+        return [tag_objs[name] for name in names]
 
     # by default, nested serializers are read-only
     def create(self, validated_data):
@@ -44,22 +185,40 @@ class RecipeSerializer(serializers.ModelSerializer):
         #  as a related field.
         # `[]` returns empty list instead of KeyError
         tags = validated_data.pop('tags', [])
-        recipe = Recipe.objects.create(**validated_data)
-        # because this is a serializer and not a view, we need
-        #  to get the user from the request context, which the
-        #  view passes the serializer.
-        auth_user = self.context['request'].user
-        for tag in tags:
-            # get_or_create gets val if exists, otherwise, creates
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                # could also do name=tag['name'], but this is more future-proof
-                #  if tag model grows
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        # all or nothing: don't leave a recipe behind with half its tags
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            if tags:
+                # add() writes all of the through rows in one insert
+                recipe.tags.add(*self._get_or_create_tags(tags))
         return recipe
 
+    def update(self, instance, validated_data):
+        """Update a recipe."""
+        # `None` means tags weren't sent (e.g. a PATCH of the title)
+        #  whereas `[]` means clear them.
+        tags = validated_data.pop('tags', None)
+        with transaction.atomic():
+            recipe = super().update(instance, validated_data)
+            if tags is not None:
+                self._sync_tags(recipe, tags)
+        return recipe
+
+    def _sync_tags(self, recipe, tags):
+        """Make the recipe's tags match `tags`, writing only the changes."""
+        # the view prefetches tags, so this is normally free
+        current = {tag.name: tag for tag in recipe.tags.all()}
+        names = {tag['name'] for tag in tags}
+
+        removed = [tag for name, tag in current.items() if name not in names]
+        added = [tag for tag in tags if tag['name'] not in current]
+        # one delete and one insert at most, and neither when a client
+        #  resends the tags it already has
+        if removed:
+            recipe.tags.remove(*removed)
+        if added:
+            recipe.tags.add(*self._get_or_create_tags(added))
+
 
 # we'll base this on the base class
 class RecipeDetailSerializer(RecipeSerializer):
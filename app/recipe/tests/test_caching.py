@@ -0,0 +1,140 @@
+"""
+Tests for the per-user response cache.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ResponseCacheTests(TestCase):
+    """Test cached responses, ETags and invalidation."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_sets_etag(self):
+        """Test list responses carry an ETag and must be revalidated."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'])
+        self.assertIn('no-cache', res['Cache-Control'])
+        self.assertIn('private', res['Cache-Control'])
+
+    def test_if_none_match_returns_304_without_queries(self):
+        """Test a matching ETag is answered before hitting the database."""
+        create_recipe(self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_cached_response_served_without_queries(self):
+        """Test a repeat request is served from the cache."""
+        recipe = create_recipe(self.user)
+        first = self.client.get(detail_url(recipe.id))
+
+        with self.assertNumQueries(0):
+            second = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_write_invalidates(self):
+        """Test a write through the API changes the ETag and the data."""
+        recipe = create_recipe(self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        res = self.client.patch(detail_url(recipe.id), {'title': 'Updated'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['results'][0]['title'], 'Updated')
+
+    def test_tag_write_invalidates_tag_list(self):
+        """Test creating a recipe with a new tag refreshes the tag list."""
+        self.client.get(TAGS_URL)
+
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 5,
+            'price': '1.00',
+            'tags': [{'name': 'Hot'}],
+        }
+        self.client.post(RECIPES_URL, payload, format='json')
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual([t['name'] for t in res.data['results']], ['Hot'])
+
+    def test_tag_delete_invalidates(self):
+        """Test deleting a tag refreshes the tag list."""
+        tag = Tag.objects.create(user=self.user, name='Gone')
+        self.client.get(TAGS_URL)
+
+        self.client.delete(reverse('recipe:tag-detail', args=[tag.id]))
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_cache_is_per_user(self):
+        """Test one user's ETag and cached data aren't served to another."""
+        create_recipe(self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+    def test_not_found_not_cached(self):
+        """Test error responses are not cached."""
+        res = self.client.get(detail_url(999999))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
@@ -0,0 +1,125 @@
+"""
+Tests for the recipe export.
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+        'description': 'Sample description',
+        'link': 'http://example.com/recipe.pdf',
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicExportTests(TestCase):
+    """Test unauthenticated export requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to export."""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportTests(TestCase):
+    """Test authenticated export requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as newline-delimited JSON."""
+        first = create_recipe(self.user, title='First')
+        first.tags.add(
+            Tag.objects.create(user=self.user, name='Soup'),
+            Tag.objects.create(user=self.user, name='Hot'),
+        )
+        second = create_recipe(self.user, title='Second')
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        create_recipe(other, title='Not mine')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        rows = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).splitlines()
+        ]
+        self.assertEqual([r['id'] for r in rows], [second.id, first.id])
+        self.assertEqual(rows[1]['title'], 'First')
+        self.assertEqual(rows[1]['price'], '5.25')
+        self.assertEqual(rows[1]['tags'], ['Hot', 'Soup'])
+        self.assertEqual(rows[0]['tags'], [])
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV with ?format=csv."""
+        recipe = create_recipe(self.user, title='Comma, in title')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='A'),
+            Tag.objects.create(user=self.user, name='B'),
+        )
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Comma, in title')
+        self.assertEqual(rows[0]['tags'], 'A|B')
+
+    def test_export_csv_accept_header(self):
+        """Test the format can be picked with the Accept header."""
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT='text/csv')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+
+    @patch('recipe.export.CHUNK_SIZE', 2)
+    def test_export_reads_in_chunks(self):
+        """Test each chunk costs two queries: recipes and their tags."""
+        for i in range(5):
+            create_recipe(self.user, title=f'Recipe {i}')
+
+        res = self.client.get(EXPORT_URL)
+        # 3 chunks of recipes + tags, plus the final empty read
+        with self.assertNumQueries(7):
+            rows = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(rows), 5)
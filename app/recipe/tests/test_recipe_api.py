@@ -3,7 +3,9 @@
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -14,12 +16,14 @@ from core.models import (
     Tag,
 )
 
+from recipe.caching import bump_data_version
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
 )
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
 
 
 def detail_url(recipe_id):
@@ -89,7 +93,8 @@ class PrivateRecipeApiTests(TestCase):
         #  matches the stucture of res.data
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEquals(res.data, serializer.data)
+        # list responses are paginated, results are under `results`
+        self.assertEquals(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is limited to authenticated user."""
@@ -108,7 +113,61 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         # compare response data to db data for the user
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_recipe_list_paginated_by_cursor(self):
+        """Test recipes are paged newest first using opaque cursors."""
+        recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+        self.assertIn('cursor=', res.data['next'])
+        seen = [r['id'] for r in res.data['results']]
+
+        # walk the remaining pages with the `next` links
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen += [r['id'] for r in res.data['results']]
+            next_url = res.data['next']
+
+        expected = [r.id for r in sorted(recipes, key=lambda r: -r.id)]
+        self.assertEqual(seen, expected)
+
+    def test_recipe_list_count(self):
+        """Test the list says how many recipes there are."""
+        for i in range(3):
+            create_recipe(user=self.user, title=f'Recipe {i}')
+        create_recipe(user=create_user(email='other@example.com'))
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.data['count'], 3)
+        self.assertTrue(res.data['count_is_exact'])
+
+    def test_recipe_list_count_estimated(self):
+        """Test counts from the threshold up are marked as estimates."""
+        for i in range(3):
+            create_recipe(user=self.user, title=f'Recipe {i}')
+
+        with self.settings(COUNT_ESTIMATE={'EXACT_BELOW': 2}):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.data['count_is_exact'])
+        # never less than what was counted before giving up
+        self.assertGreaterEqual(res.data['count'], 2)
+
+    def test_recipe_list_invalid_cursor(self):
+        """Test a tampered cursor returns not found."""
+        res = self.client.get(RECIPES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_get_recipe_detail(self):
         """Test get recipe detail."""
@@ -301,3 +360,485 @@ class PrivateRecipeApiTests(TestCase):
                 tag['name'],
                 [t.name for t in recipe.tags.all()],
             )
+
+    def test_update_recipe_replaces_tags(self):
+        """Test updating tags adds new ones and removes missing ones."""
+        recipe = create_recipe(user=self.user)
+        breakfast = Tag.objects.create(user=self.user, name='Breakfast')
+        lunch = Tag.objects.create(user=self.user, name='Lunch')
+        recipe.tags.add(breakfast, lunch)
+
+        payload = {'tags': [{'name': 'Lunch'}, {'name': 'Dinner'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = sorted(t.name for t in recipe.tags.all())
+        self.assertEqual(names, ['Dinner', 'Lunch'])
+        # the tag itself is kept, it's only unlinked from the recipe
+        self.assertTrue(Tag.objects.filter(id=breakfast.id).exists())
+        # the unchanged tag keeps its through row
+        self.assertIn(lunch, recipe.tags.all())
+
+    def test_update_recipe_assign_existing_tag(self):
+        """Test assigning an existing tag when updating a recipe."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Breakfast'))
+        lunch = Tag.objects.create(user=self.user, name='Lunch')
+
+        payload = {'tags': [{'name': 'Lunch'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.tags.all()), [lunch])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_clear_recipe_tags(self):
+        """Test an empty tag list clears the recipe's tags."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Dessert'))
+
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {'tags': []},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.tags.count(), 0)
+
+    def test_update_without_tags_keeps_tags(self):
+        """Test a PATCH that doesn't mention tags leaves them alone."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Dessert'))
+
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {'title': 'New title'},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.tags.count(), 1)
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with tags in one request."""
+        Tag.objects.create(user=self.user, name='Dinner')
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10 + i,
+                'price': '2.50',
+                'tags': [{'name': 'Dinner'}, {'name': f'Tag {i % 2}'}],
+            }
+            for i in range(4)
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 4)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 4)
+        for item, result in zip(payload, res.data):
+            self.assertEqual(result['status'], status.HTTP_201_CREATED)
+            self.assertEqual(result['data']['title'], item['title'])
+            recipe = recipes.get(id=result['data']['id'])
+            self.assertEqual(
+                sorted(t.name for t in recipe.tags.all()),
+                sorted(t['name'] for t in item['tags']),
+            )
+        # existing and repeated tags are reused, not duplicated
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test invalid items are reported and valid ones still created."""
+        payload = [
+            {'title': 'Good', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'Bad', 'price': '1.00'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data[0]['status'], status.HTTP_201_CREATED)
+        self.assertEqual(res.data[1]['status'], status.HTTP_400_BAD_REQUEST)
+        self.assertIn('time_minutes', res.data[1]['errors'])
+        titles = Recipe.objects.filter(user=self.user).values_list(
+            'title',
+            flat=True,
+        )
+        self.assertEqual(list(titles), ['Good'])
+
+    def test_bulk_create_all_invalid(self):
+        """Test nothing is created when every item is invalid."""
+        res = self.client.post(BULK_URL, [{'title': 'Bad'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test the bulk endpoint rejects a single object."""
+        res = self.client.post(
+            BULK_URL,
+            {'title': 'Solo', 'time_minutes': 5, 'price': '1.00'},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        """Test searching title, tag names and description, best first."""
+        in_title = create_recipe(
+            user=self.user,
+            title='Spicy noodles',
+            description='Quick dinner',
+        )
+        in_tag = create_recipe(user=self.user, title='Ramen')
+        in_tag.tags.add(Tag.objects.create(user=self.user, name='Noodle'))
+        in_description = create_recipe(
+            user=self.user,
+            title='Stir fry',
+            description='Serve with noodles',
+        )
+        create_recipe(user=self.user, title='Pancakes')
+        other_user = create_user(email='other@example.com')
+        create_recipe(user=other_user, title='Noodle soup')
+
+        res = self.client.get(RECIPES_URL, {'search': 'noodles'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [r['id'] for r in res.data['results']]
+        # title matches outrank tags, which outrank the description
+        self.assertEqual(ids, [in_title.id, in_tag.id, in_description.id])
+
+    def test_search_follows_updates(self):
+        """Test the search index follows edits and tag renames."""
+        recipe = create_recipe(user=self.user, title='Toast')
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL, {'search': 'breakfast'})
+        self.assertEqual(len(res.data['results']), 1)
+
+        tag.name = 'Brunch'
+        tag.save()
+        bump_data_version(self.user)
+        res = self.client.get(RECIPES_URL, {'search': 'breakfast'})
+        self.assertEqual(res.data['results'], [])
+        res = self.client.get(RECIPES_URL, {'search': 'brunch'})
+        self.assertEqual(len(res.data['results']), 1)
+
+        recipe.tags.clear()
+        recipe.title = 'Avocado toast'
+        recipe.save()
+        bump_data_version(self.user)
+        res = self.client.get(RECIPES_URL, {'search': 'brunch'})
+        self.assertEqual(res.data['results'], [])
+        res = self.client.get(RECIPES_URL, {'search': 'avocado'})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_search_paginated(self):
+        """Test paging through ranked search results."""
+        expected = []
+        for i in range(7):
+            # varying relevance, with some ties
+            recipe = create_recipe(
+                user=self.user,
+                title='Curry' + ' curry' * (i % 3),
+                description=f'Number {i}',
+            )
+            expected.append(recipe.id)
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry', 'page_size': 2})
+        seen = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [r['id'] for r in res.data['results']]
+
+        self.assertEqual(sorted(seen), sorted(expected))
+
+    def test_filter_by_any_tag(self):
+        """Test filtering recipes that have any of the tags."""
+        r1 = create_recipe(user=self.user, title='Thai curry')
+        r2 = create_recipe(user=self.user, title='Tahini salad')
+        r3 = create_recipe(user=self.user, title='Fish and chips')
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        veggie = Tag.objects.create(user=self.user, name='Vegetarian')
+        r1.tags.add(vegan, veggie)
+        r2.tags.add(veggie)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{vegan.id},{veggie.id}'})
+
+        ids = [r['id'] for r in res.data['results']]
+        # r1 has both tags but is only returned once
+        self.assertEqual(ids, [r2.id, r1.id])
+        self.assertNotIn(r3.id, ids)
+
+    def test_filter_by_all_tags(self):
+        """Test filtering recipes that have every one of the tags."""
+        r1 = create_recipe(user=self.user, title='Thai curry')
+        r2 = create_recipe(user=self.user, title='Tahini salad')
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        veggie = Tag.objects.create(user=self.user, name='Vegetarian')
+        r1.tags.add(vegan, veggie)
+        r2.tags.add(veggie)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{vegan.id},{veggie.id}', 'tags_match': 'all'},
+        )
+
+        self.assertEqual([r['id'] for r in res.data['results']], [r1.id])
+
+    def test_filter_by_tags_invalid(self):
+        """Test a malformed tag filter is rejected."""
+        res = self.client.get(RECIPES_URL, {'tags': '1,two'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_tags_match_invalid(self):
+        """Test tags_match other than any or all is rejected."""
+        for value in ['ALL', 'every', '']:
+            with self.subTest(value=value):
+                res = self.client.get(
+                    RECIPES_URL,
+                    {'tags': '1', 'tags_match': value},
+                )
+
+                self.assertEqual(
+                    res.status_code,
+                    status.HTTP_400_BAD_REQUEST,
+                )
+                self.assertIn('tags_match', res.data)
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test recipe endpoints run a fixed number of queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipes_with_tags(self, count):
+        """Create `count` recipes, each with two tags."""
+        recipes = []
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {recipe.id}a'),
+                Tag.objects.create(user=self.user, name=f'Tag {recipe.id}b'),
+            )
+            recipes.append(recipe)
+        return recipes
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes doesn't run a query per recipe."""
+        self.create_recipes_with_tags(2)
+        # recipes, their count and the prefetched tags
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        self.create_recipes_with_tags(8)
+        # the ORM writes above bypass the API, so invalidate the
+        #  cached list by hand
+        bump_data_version(self.user)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_retrieve_query_count(self):
+        """Test retrieving a recipe with tags."""
+        recipe = self.create_recipes_with_tags(1)[0]
+
+        with self.assertNumQueries(2):
+            res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(len(res.data['tags']), 2)
+
+    def test_create_query_count(self):
+        """Test creating a recipe without tags."""
+        payload = {
+            'title': 'Sample recipe',
+            'time_minutes': 30,
+            'price': Decimal('5.99'),
+        }
+
+        # savepoint, insert the recipe, release savepoint, then read
+        #  its (empty) tags for the response. the savepoint queries come
+        #  from transaction.atomic() running inside the test's transaction.
+        with self.assertNumQueries(4):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_update_query_count(self):
+        """Test partially updating a recipe."""
+        recipe = self.create_recipes_with_tags(1)[0]
+
+        # fetch recipe + tags, savepoint, update, release savepoint,
+        #  then re-read tags for the response
+        with self.assertNumQueries(6):
+            res = self.client.patch(
+                detail_url(recipe.id),
+                {'time_minutes': 45},
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create_with_tags_query_count(self):
+        """Test creating a recipe costs the same for 2 or 30 tags."""
+        Tag.objects.create(user=self.user, name='Existing')
+        for count in (2, 30):
+            payload = {
+                'title': f'Recipe with {count} tags',
+                'time_minutes': 30,
+                'price': Decimal('5.99'),
+                'tags': [{'name': 'Existing'}] + [
+                    {'name': f'Tag {count}-{i}'} for i in range(count - 1)
+                ],
+            }
+            # savepoint, insert recipe, select existing tags, insert
+            #  missing tags, insert through rows, release savepoint,
+            #  read tags for the response
+            with self.assertNumQueries(7):
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(res.data['tags']), count)
+
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name='Existing').count(),
+            1,
+        )
+
+    def test_update_with_unchanged_tags_writes_no_tags(self):
+        """Test resending the current tags doesn't touch recipe_tags."""
+        recipe = self.create_recipes_with_tags(1)[0]
+        payload = {
+            'title': 'Renamed',
+            'tags': [{'name': t.name} for t in recipe.tags.all()],
+        }
+
+        # fetch recipe + tags, savepoint, update recipe, release savepoint,
+        #  re-read tags for the response. no tag or through-table writes.
+        with self.assertNumQueries(6) as ctx:
+            res = self.client.patch(
+                detail_url(recipe.id),
+                payload,
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for query in ctx.captured_queries:
+            self.assertFalse(
+                query['sql'].startswith(('INSERT', 'DELETE')),
+                query['sql'],
+            )
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test bulk creating costs the same for 2 or 50 recipes."""
+        for count in (2, 50):
+            payload = [
+                {
+                    'title': f'Recipe {i}',
+                    'time_minutes': 10,
+                    'price': '2.50',
+                    'tags': [{'name': f'Tag {i}'}, {'name': 'Shared'}],
+                }
+                for i in range(count)
+            ]
+            # savepoint, insert recipes, select tags, insert tags,
+            #  insert through rows, release savepoint, then re-read the
+            #  recipes and their tags for the response
+            with self.assertNumQueries(8):
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(res.data), count)
+
+
+class SparseFieldsTests(TestCase):
+    """Test ?fields= and ?omit= on the recipe endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+    def test_list_fields(self):
+        """Test only the requested fields are returned and selected."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': self.recipe.title}],
+        )
+        # the page and its count. no tags query and no unused columns.
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"price"', queries[0]['sql'])
+
+    def test_list_omit(self):
+        """Test omitted fields are left out."""
+        res = self.client.get(RECIPES_URL, {'omit': 'tags,link'})
+
+        self.assertEqual(
+            set(res.data['results'][0]),
+            {'id', 'title', 'time_minutes', 'price'},
+        )
+
+    def test_retrieve_fields(self):
+        """Test the detail view takes ?fields= too."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                detail_url(self.recipe.id),
+                {'fields': 'description'},
+            )
+
+        self.assertEqual(res.data, {'description': self.recipe.description})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"title"', queries[0]['sql'])
+
+    def test_unknown_field_rejected(self):
+        """Test asking for a field that doesn't exist returns a 400."""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+    def test_fields_and_omit_overlap(self):
+        """Test omitting a field ?fields= already left out."""
+        res = self.client.get(RECIPES_URL, {'fields': 'id', 'omit': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{'id': self.recipe.id}])
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            {'fields': 'id', 'omit': 'title'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': self.recipe.id})
+
+    def test_empty_fields_rejected(self):
+        """Test an empty ?fields= returns a 400."""
+        res = self.client.get(RECIPES_URL, {'fields': ''})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+    def test_writes_ignore_fields(self):
+        """Test ?fields= doesn't stop fields from being validated."""
+        payload = {'title': 'Soup', 'time_minutes': 10, 'price': '1.00'}
+
+        res = self.client.post(f'{RECIPES_URL}?fields=id', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['title'], 'Soup')
@@ -0,0 +1,131 @@
+"""
+Tests for the values() row fast path of the recipe list.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import serializers as drf_serializers
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from core.renderers import FastJSONRenderer
+from recipe.rows import RowSerializer
+from recipe.serializers import (
+    RecipeDetailSerializer,
+    RecipeSerializer,
+)
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RowSerializerTests(TestCase):
+    """Test rows serialize exactly like the model serializers."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        dessert = Tag.objects.create(user=self.user, name='Crème brûlée')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        # values that exercise the field formatting: decimals to be
+        #  quantized, blanks, unicode and tags added out of order
+        recipes = [
+            Recipe.objects.create(
+                user=self.user,
+                title='Soup',
+                time_minutes=10,
+                price=Decimal('5.5'),
+                description='Hot\nsoup',
+                link='https://example.com/soup',
+            ),
+            Recipe.objects.create(
+                user=self.user,
+                title='Tarte tatin ☕',
+                time_minutes=90,
+                price=Decimal('0'),
+            ),
+            Recipe.objects.create(
+                user=self.user,
+                title='Water',
+                time_minutes=0,
+                price=Decimal('999.99'),
+            ),
+        ]
+        recipes[0].tags.add(vegan, quick)
+        recipes[1].tags.add(quick, dessert, vegan)
+
+    def assert_same_output(self, serializer_class):
+        """Check rows and instances render to the same bytes."""
+        queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+        expected = serializer_class(
+            queryset.prefetch_related('tags'),
+            many=True,
+        ).data
+
+        rows = RowSerializer(serializer_class())
+        self.assertTrue(rows.supported)
+        data = rows.to_representation(rows.get_queryset(queryset))
+
+        self.assertEqual(
+            FastJSONRenderer().render(data),
+            FastJSONRenderer().render(expected),
+        )
+
+    # these compare every field the serializers have, so they also
+    #  cover fields added later on
+    def test_recipe_serializer_parity(self):
+        """Test rows match RecipeSerializer."""
+        self.assert_same_output(RecipeSerializer)
+
+    def test_recipe_detail_serializer_parity(self):
+        """Test rows match RecipeDetailSerializer."""
+        self.assert_same_output(RecipeDetailSerializer)
+
+    def test_list_response_parity(self):
+        """Test the list endpoint returns what RecipeSerializer would."""
+        recipes = Recipe.objects.filter(
+            user=self.user,
+        ).order_by('-id').prefetch_related('tags')
+        expected = {
+            'count': 3,
+            'count_is_exact': True,
+            'next': None,
+            'previous': None,
+            'results': RecipeSerializer(recipes, many=True).data,
+        }
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.content, FastJSONRenderer().render(expected))
+
+    def test_list_query_count(self):
+        """Test the fast path runs one query for rows and one for tags."""
+        # and one for the count
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+
+    def test_unsupported_serializer_not_used(self):
+        """Test serializers with computed fields aren't handled."""
+
+        class ComputedSerializer(RecipeSerializer):
+            summary = drf_serializers.SerializerMethodField()
+
+            class Meta(RecipeSerializer.Meta):
+                fields = RecipeSerializer.Meta.fields + ['summary']
+
+            def get_summary(self, recipe):
+                return recipe.title[:10]
+
+        self.assertFalse(RowSerializer(ComputedSerializer()).supported)
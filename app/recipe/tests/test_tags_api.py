@@ -1,4 +1,7 @@
 """Tests for tag APIs."""
+from decimal import Decimal
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
@@ -6,7 +9,10 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import (
+    Recipe,
+    Tag,
+)
 
 from recipe.serializers import (
     TagSerializer
@@ -64,7 +70,7 @@ class PrivateRecipeApiTests(TestCase):
         # many=True because we're going to be getting multiple
         serializer = TagSerializer(tags, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test list of tags is limited to authenticated user."""
@@ -77,16 +83,65 @@ class PrivateRecipeApiTests(TestCase):
 
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
 
         # get user 1's tags from the db
         tags = Tag.objects.filter(user=self.user)
         # convert tags to simple list
         serializer = TagSerializer(tags, many=True)
         # compare response data to db data for the user
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_tags_paginated_by_cursor(self):
+        """Test tags are paged by name using opaque cursors."""
+        for name in ['Apple', 'Banana', 'Cherry']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [t['name'] for t in res.data['results']]
+        self.assertEqual(names, ['Cherry', 'Banana'])
+
+        res = self.client.get(res.data['next'])
+        names = [t['name'] for t in res.data['results']]
+        self.assertEqual(names, ['Apple'])
+        self.assertIsNone(res.data['next'])
+
+    def test_tags_fields(self):
+        """Test ?fields= narrows the tags returned."""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL, {'fields': 'name'})
+
+        self.assertEqual(res.data['results'], [{'name': 'Vegan'}])
+
+    def test_tags_fields_without_ordering_field(self):
+        """Test leaving out the name doesn't load it tag by tag."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        # the page and its count
+        with self.assertNumQueries(2):
+            res = self.client.get(TAGS_URL, {'fields': 'id'})
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_tags_fields_and_omit_overlap(self):
+        """Test omitting a field ?fields= already left out."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL, {'fields': 'id', 'omit': 'name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{'id': tag.id}])
+
+    def test_tags_empty_fields_rejected(self):
+        """Test an empty ?fields= returns a 400."""
+        res = self.client.get(TAGS_URL, {'fields': ''})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_update_tag(self):
         """"Test updating a tag."""
@@ -99,6 +154,35 @@ class PrivateRecipeApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEquals(tag.name, new_value)
 
+    def test_update_tag_to_existing_name_fails(self):
+        """Test renaming a tag to the name of another tag is rejected."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Vegetarian')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegetarian')
+
+    def test_update_tag_name_taken_meanwhile_fails(self):
+        """Test losing a race for a name is a 400, not a 500."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Vegetarian')
+
+        # as if the other tag was renamed after the check
+        with patch.object(
+            TagSerializer,
+            'validate_name',
+            lambda self, value: value,
+        ):
+            res = self.client.patch(detail_url(tag.id), {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegetarian')
+
     def test_delete_tag(self):
         """Test deleting a tag."""
         tag = Tag.objects.create(user=self.user, name="Bad Tasting")
@@ -107,3 +191,38 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEquals(res.status_code, status.HTTP_204_NO_CONTENT)
         tags = Tag.objects.filter(user=self.user)
         self.assertFalse(tags.exists())
+
+    def test_filter_tags_assigned_to_recipes(self):
+        """Test listing only tags that are assigned to recipes."""
+        used = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        recipe = Recipe.objects.create(
+            title='Green eggs',
+            time_minutes=10,
+            price=Decimal('2.50'),
+            user=self.user,
+        )
+        recipe.tags.add(used)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(
+            [t['id'] for t in res.data['results']],
+            [used.id],
+        )
+
+    def test_filtered_tags_unique(self):
+        """Test a tag on several recipes is only listed once."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        for title in ['Pancakes', 'Porridge']:
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=Decimal('1.00'),
+                user=self.user,
+            )
+            recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
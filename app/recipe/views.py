@@ -2,21 +2,105 @@
 Views for the recipe APIs.
 """
 
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+)
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import (
+    F,
+    FloatField,
+)
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+
 from rest_framework import (
     viewsets,
     mixins,  # things you can add to a view for more functionality
+    status,
 )
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from core.authentication import CachedTokenAuthentication
 from core.models import (
     Recipe,
     Tag,
 )
-from recipe import serializers
+from core.replicas import ReplicaReadMixin
+from recipe import (
+    export,
+    serializers,
+)
+from recipe.caching import (
+    CachedListMixin,
+    CachedRetrieveMixin,
+)
+from recipe.filters import (
+    filter_assigned_tags,
+    filter_recipes_by_tags,
+)
+from recipe.pagination import (
+    RecipeCursorPagination,
+    TagCursorPagination,
+)
+from recipe.rows import RowListMixin
+
+
+# most ids a filter like ?tags= accepts
+MAX_FILTER_IDS = 50
+
+
+def _params_to_ints(value, param):
+    """Convert a comma separated string of ids to a list of ints."""
+    try:
+        ids = [int(str_id) for str_id in value.split(',')]
+    except ValueError:
+        raise ValidationError({param: 'Expected comma separated ids.'})
+    if len(ids) > MAX_FILTER_IDS:
+        raise ValidationError({param: f'At most {MAX_FILTER_IDS} ids.'})
+    return ids
+
+
+def _tags_match_all(value):
+    """Return True for ?tags_match=all, False for any (the default)."""
+    if value not in (None, 'any', 'all'):
+        raise ValidationError({'tags_match': 'Expected any or all.'})
+    return value == 'all'
+
+
+def _only_serialized_columns(queryset, serializer, ordering):
+    """Load just the columns the serializer outputs or the page orders by."""
+    model = queryset.model
+    names = [model._meta.pk.name]
+    names += [name.lstrip('-') for name in ordering]
+    names += [field.source for field in serializer.fields.values()]
+    columns = []
+    for name in dict.fromkeys(names):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # e.g. the search rank annotation
+            continue
+        if field.concrete and not field.many_to_many:
+            columns.append(name)
 
+    if 'tags' not in names:
+        # no need to fetch what won't be shown
+        queryset = queryset.prefetch_related(None)
+    return queryset.only(*columns)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(
+        ReplicaReadMixin,
+        CachedRetrieveMixin,
+        CachedListMixin,
+        # after the caching, so that only cache misses build rows
+        RowListMixin,
+        viewsets.ModelViewSet,
+):
     """View for managing recipe APIs."""
 
     # since most methods will use the detail serializer
@@ -24,13 +108,57 @@ class RecipeViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
     # authentication
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     # authorization
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
 
     def get_queryset(self):
         """Retrieve recipes for authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        # prefetch the nested tags in one extra query for the whole page
+        #  rather than one query per recipe (the N+1 problem).
+        queryset = self.queryset.filter(
+            user=self.request.user
+        ).order_by('-id').prefetch_related('tags')
+
+        search = self.request.query_params.get('search')
+        if search and self.action == 'list':
+            # matched with the GIN index on search_vector, best
+            #  matches first (the pagination orders by rank)
+            query = SearchQuery(
+                search,
+                config='english',
+                search_type='websearch',
+            )
+            queryset = queryset.filter(search_vector=query).annotate(
+                # ts_rank is a `real`. as double precision the value
+                #  survives the round trip through the cursor exactly.
+                rank=Cast(
+                    SearchRank(F('search_vector'), query),
+                    FloatField(),
+                ),
+            )
+
+        tags = self.request.query_params.get('tags')
+        if tags and self.action == 'list':
+            # ?tags=1,4,9 matches any of them, add &tags_match=all
+            #  to only get recipes that have every one of them
+            queryset = filter_recipes_by_tags(
+                queryset,
+                _params_to_ints(tags, 'tags'),
+                match_all=_tags_match_all(
+                    self.request.query_params.get('tags_match'),
+                ),
+            )
+
+        # ?fields= and ?omit= (see SparseFieldsMixin)
+        if self.action in ('list', 'retrieve'):
+            queryset = _only_serialized_columns(
+                queryset,
+                self.get_serializer(),
+                self.paginator.ordering,
+            )
+        return queryset
 
     # method that's called when DRF wants to determine the class
     #  being used for a particular action
@@ -57,9 +185,101 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe."""
         serializer.save(user=self.request.user)
 
+    # most recipes a single bulk request may create
+    bulk_max_size = 1000
+
+    # adds POST /api/recipe/recipes/bulk/
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='bulk',
+        url_name='bulk',
+    )
+    def bulk_create(self, request):
+        """Create many recipes from a JSON array in one request."""
+        if not isinstance(request.data, list):
+            raise ValidationError('Expected a list of recipes.')
+        if len(request.data) > self.bulk_max_size:
+            raise ValidationError(
+                f'At most {self.bulk_max_size} recipes per request.'
+            )
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        # validate each item on its own, so that one bad recipe doesn't
+        #  reject the whole batch. (ListSerializer.is_valid is all or
+        #  nothing.)
+        results = []
+        valid = []
+        for item in request.data:
+            try:
+                attrs = serializer.child.run_validation(item)
+            except ValidationError as exc:
+                results.append({
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': exc.detail,
+                })
+            else:
+                valid.append({**attrs, 'user': request.user})
+                results.append(None)
+
+        created = serializer.create(valid)
+        # re-read with the tags prefetched to build the response
+        recipes = self.get_queryset().in_bulk([r.id for r in created])
+        created_data = iter(
+            self.get_serializer(
+                [recipes[r.id] for r in created],
+                many=True,
+            ).data
+        )
+        results = [
+            result or {
+                'status': status.HTTP_201_CREATED,
+                'data': next(created_data),
+            }
+            for result in results
+        ]
+
+        if not created and results:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(created) < len(results):
+            # some were created, some weren't
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response(results, status=response_status)
+
+    # adds GET /api/recipe/recipes/export/
+    #  pick the format with the Accept header or ?format=csv|ndjson
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        url_name='export',
+        renderer_classes=[export.NDJSONRenderer, export.CSVRenderer],
+    )
+    def export_recipes(self, request):
+        """Stream all of the user's recipes as NDJSON or CSV."""
+        renderer = request.accepted_renderer
+        queryset = self.get_queryset().prefetch_related(None)
+        # the body is streamed after the view returns, when the request
+        #  no longer reads from a replica, so pick the database now
+        queryset = queryset.using(queryset.db)
+        # streamed chunk by chunk so memory stays flat however many
+        #  recipes there are
+        response = StreamingHttpResponse(
+            export.STREAMS[renderer.format](queryset),
+            content_type=f'{renderer.media_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+        return response
+
 
 # viewset because just CRUD
 class TagViewSet(
+        ReplicaReadMixin,
+        CachedListMixin,
         mixins.UpdateModelMixin,  # this one allows writes
         mixins.DestroyModelMixin,
         # this combination only providees list/GET
@@ -70,10 +290,25 @@ class TagViewSet(
 
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = TagCursorPagination
 
     def get_queryset(self):
         """Retrieve tags for authenticated user."""
         # without this, it would get all tags
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(
+            user=self.request.user
+        ).order_by('-name')
+
+        assigned_only = self.request.query_params.get('assigned_only')
+        if assigned_only in ('1', 'true'):
+            queryset = filter_assigned_tags(queryset)
+
+        if self.action == 'list':
+            queryset = _only_serialized_columns(
+                queryset,
+                self.get_serializer(),
+                self.paginator.ordering,
+            )
+        return queryset
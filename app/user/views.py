@@ -3,12 +3,13 @@ Views for the user API.
 """
 from rest_framework import (
     generics,
-    authentication,
     permissions
 )
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
+from core.replicas import ReplicaReadMixin
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
@@ -36,11 +37,11 @@ class CreateTokenView(ObtainAuthToken):
 
 # RUAV is provided by django for retrieving and updating objs in db
 # get = retrieve, patch = update
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
     # authentication
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     # authorization: must be authenticated -- no other restrictions
     permission_classes = [permissions.IsAuthenticated]
 